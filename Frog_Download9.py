@@ -1,20 +1,30 @@
 import os
-import yt_dlp
 import tkinter as tk
 from tkinter import messagebox, scrolledtext, font, ttk, filedialog
 import threading
-import shutil
 import sys
 import subprocess
 import platform
 import customtkinter as ctk
+from gui_events import GuiEventPump
+from gui_profiler import profiler_from_env
+from status_log import StatusLog
+from progress_tracker import ProgressAggregator
+from job_table import JobTable
+from download_queue import DownloadQueue
+from ffmpeg_caps import get_ffmpeg_capabilities
+from fragment_tuner import AdaptiveFragmentTuner, FRAGMENT_CHOICES, DEFAULT_FRAGMENTS
+from rate_limiter import BANDWIDTH_CHOICES
+from download_archive import DownloadArchive
+from resume_store import ResumeStore
+from metadata_cache import MetadataCache
+from metrics import metrics_from_env
+from frog_engine import DownloadEngine, DownloadSettings, warm_up as warm_up_engine
 
 CONFIG_FILE = "config.txt"
 
 def is_ffmpeg_installed():
-    result = shutil.which("ffmpeg") is not None
-    print(f"ffmpeg detected: {result}")
-    return result
+    return get_ffmpeg_capabilities().available
 
 def load_khmer_font():
     font_name = "Khmer OS Siemreap"
@@ -73,15 +83,25 @@ class ScrollableFrame(tk.Frame):
                     grandchild.bind("<Button-5>", scroll)
 
 class MediaDownloaderGUI:
-    def __init__(self, root):
+    def __init__(self, root, profiler=None):
         self.root = root
         self.root.title("Frog Downloader v1.0")
         self.root.geometry("900x750")
+        self.events = GuiEventPump(self.root, {'log': self.write_status_lines, 'progress': self.apply_progress, 'job': self.apply_job_progress}, profiler=profiler)
         self.theme = "light"
         ctk.set_appearance_mode("light")
         self.set_theme()
 
         self.download_folder = self.load_download_folder()
+        self.queue = DownloadQueue()
+        self.archive = DownloadArchive()
+        self.resume = ResumeStore()
+        self.metadata = MetadataCache()
+        self.metrics = metrics_from_env()
+        self.fragment_tuner = AdaptiveFragmentTuner()
+        self.progress_aggregator = ProgressAggregator(lambda jobs: self.events.post('job', jobs))
+        self.engine = DownloadEngine(queue=self.queue, archive=self.archive, resume=self.resume, metadata=self.metadata, metrics=self.metrics, fragment_tuner=self.fragment_tuner,
+                                     log=self.log_status, progress_hooks=[self.progress_hook, self.progress_aggregator.progress_hook])
 
         '''
         try:
@@ -197,6 +217,18 @@ class MediaDownloaderGUI:
         ctk.CTkRadioButton(type_frame, text="Video", variable=self.dl_type_var, value='video', font=self.secondary_font, text_color=self.colors['text2']).pack(side=tk.LEFT, padx=5)
         ctk.CTkRadioButton(type_frame, text="Audio Only", variable=self.dl_type_var, value='audio', font=self.secondary_font, text_color=self.colors['text2']).pack(side=tk.LEFT, padx=5)
 
+        # Fragment parallelism for HLS/DASH
+        fragment_frame = tk.Frame(self.main_frame, bg=self.colors['card'], bd=1, relief=tk.SOLID, padx=15, pady=15)
+        fragment_frame.pack(fill=tk.X, pady=10)
+        ctk.CTkLabel(fragment_frame, text="Fragment parallelism (HLS/DASH):", font=self.secondary_font, text_color=self.colors['text']).pack(side=tk.LEFT)
+        self.fragments_var = tk.StringVar(value=DEFAULT_FRAGMENTS)
+        ctk.CTkOptionMenu(fragment_frame, variable=self.fragments_var, values=FRAGMENT_CHOICES, font=self.secondary_font, fg_color=self.colors['accent'], button_color=self.colors['accent_active']).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(fragment_frame, text="Bandwidth cap MB/s (0 = unlimited):", font=self.secondary_font, text_color=self.colors['text']).pack(side=tk.LEFT, padx=(15, 0))
+        self.bandwidth_var = tk.StringVar(value=BANDWIDTH_CHOICES[0])
+        ctk.CTkOptionMenu(fragment_frame, variable=self.bandwidth_var, values=BANDWIDTH_CHOICES, command=self.set_bandwidth_limit, font=self.secondary_font, fg_color=self.colors['accent'], button_color=self.colors['accent_active']).pack(side=tk.LEFT, padx=5)
+        self.dedupe_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(fragment_frame, text="Hardlink duplicate files", variable=self.dedupe_var, font=self.secondary_font, text_color=self.colors['text'], fg_color=self.colors['accent']).pack(side=tk.LEFT, padx=(15, 0))
+
         # Save location
         location_frame = tk.Frame(self.main_frame, bg=self.colors['card'], bd=1, relief=tk.SOLID, padx=15, pady=15)
         location_frame.pack(fill=tk.X, pady=10)
@@ -217,8 +249,13 @@ class MediaDownloaderGUI:
         ctk.CTkLabel(status_frame, text="ស្ថានភាព:", font=self.label_font, text_color=self.colors['text']).pack(anchor='w')
         self.status_text = scrolledtext.ScrolledText(status_frame, width=60, height=8, state='disabled', font=self.secondary_font, bg=self.colors['card'], fg=self.colors['text'])
         self.status_text.pack(pady=5, fill=tk.X)
+        self.status_log = StatusLog(self.status_text)
         self.progress = ttk.Progressbar(status_frame, mode='determinate')
         self.progress.pack(fill=tk.X, pady=5)
+        self.job_table = JobTable(status_frame, font=self.secondary_font)
+        self.job_table.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.events.start()
+        self.progress_aggregator.start()
 
         # Footer
         footer_frame = tk.Frame(self.root, bg=self.colors['bg'], pady=15)
@@ -228,9 +265,38 @@ class MediaDownloaderGUI:
         self.theme_button = ctk.CTkButton(footer_frame, text="Dark Theme", command=self.toggle_theme, **self.button_style)
         self.theme_button.pack(side=tk.LEFT, padx=5, pady=5)
 
+        self.log_status("ចំណាំ: សម្រាប់ Instagram/Facebook មាតិកាឯកជន សូមបញ្ចូលឯកសារខូគី។ នាំចេញខូគីពីកម្មវិធីរុករក។")
+        self.root.after(100, lambda: threading.Thread(target=self.warm_up, name="frog-warm-up", daemon=True).start())
+        self.root.after(500, self.resume_unfinished_downloads)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        # Give up this window's queue lease, so the next start can offer its unfinished URLs at once
+        self.queue.close()
+        self.root.destroy()
+
+    def warm_up(self):
+        # Runs after the window has painted, so startup never waits for the
+        # ffmpeg probe or the yt_dlp import
         ffmpeg_status = "ffmpeg ត្រូវបានរកឃើញ។ ប្រើគុណភាពល្អបំផុត។" if is_ffmpeg_installed() else "ffmpeg មិនត្រូវបានរកឃើញ។ ប្រើស្ទ្រីមតែមួយ (គុណភាពទាបជាង)។ ដំឡើង ffmpeg សម្រាប់គុណភាពល្អបំផុត១"
         self.log_status(f"ព័ត៌មាន: {ffmpeg_status}")
-        self.log_status("ចំណាំ: សម្រាប់ Instagram/Facebook មាតិកាឯកជន សូមបញ្ចូលឯកសារខូគី។ នាំចេញខូគីពីកម្មវិធីរុករក។")
+        warm_up_engine()
+
+    def resume_unfinished_downloads(self):
+        self.queue.clear_finished()
+        jobs = self.queue.unfinished()
+        if not jobs:
+            return
+        if not messagebox.askyesno("បន្តការទាញយក", f"មាន {len(jobs)} URL ដែលមិនទាន់ទាញយករួច។ បន្តទាញយកឥឡូវនេះ?"):
+            self.queue.discard_unfinished([job_id for job_id, url, mode in jobs])
+            return
+        if not self.prompt_for_download_folder():
+            self.log_status("❌ កំហុស: មិនបានជ្រើសរើសទីតាំងរក្សាទុក។")
+            return
+        self.log_status(f"កំពុងបន្តការទាញយក {len(jobs)} URL ពីវគ្គមុន...")
+        self.progress['value'] = 0
+        self.progress['maximum'] = 100
+        threading.Thread(target=self._download, args=(jobs, self.get_download_settings(), True), daemon=True).start()
 
     def browse_location(self):
         folder = filedialog.askdirectory()
@@ -365,130 +431,44 @@ class MediaDownloaderGUI:
                     widget.configure(fg_color=self.colors['accent'], hover_color=self.colors['accent_active'], text_color="white", text_color_disabled="#606770", corner_radius=8)
         style = ttk.Style()
         style.configure("TProgressbar", troughcolor=self.colors['bg'], background=self.colors['accent'])
+        self.job_table.set_colors(self.colors['card'], self.colors['text2'])
 
     def log_status(self, message):
-        self.status_text.config(state='normal')
-        self.status_text.insert(tk.END, f"{message}\n")
-        self.status_text.see(tk.END)
-        self.status_text.config(state='disabled')
-
-    def get_ydl_opts(self, url):
-        download_path = self.location_entry.get().strip() or self.download_folder or os.path.expanduser("~/Downloads")
-        os.makedirs(download_path, exist_ok=True)
-
-        platform = self.platform_var.get()
-        if platform == 'auto':
-            url_lower = url.lower()
-            if 'youtube.com' in url_lower or 'youtu.be' in url_lower:
-                platform = 'youtube'
-            elif 'instagram.com' in url_lower:
-                platform = 'instagram'
-            elif 'facebook.com' in url_lower:
-                platform = 'facebook'
-
-        opts = {
-            'outtmpl': os.path.join(download_path, '%(title)s.%(ext)s'),
-            'progress_hooks': [self.progress_hook],
-            'quiet': False,  # Enable verbose output for debugging
-            'no_warnings': False,
-            'ignoreerrors': True,  # Ignore errors to continue downloading
-            'retries': 10,  # Retry on network errors
-            'fragment_retries': 10,  # Retry on fragment download errors
-            'extractor_retries': 10,  # Retry on extractor errors
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-            }
-        }
-
-        if platform == 'youtube':
-            opts['referer'] = 'https://www.youtube.com/'
-            if self.dl_type_var.get() == 'audio':
-                opts['format'] = 'bestaudio/best'
-                if is_ffmpeg_installed():
-                    opts['postprocessors'] = [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }]
-                else:
-                    self.log_status("⚠️ Warning: ffmpeg not found. Audio will be downloaded as is.")
-            else:
-                opts['format'] = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best' if is_ffmpeg_installed() else 'best[ext=mp4]'
-                if is_ffmpeg_installed():
-                    opts['postprocessors'] = [{
-                        'key': 'FFmpegVideoRemuxer',
-                        'preferedformat': 'mp4'
-                    }]
-
-        elif platform == 'instagram':
-            opts['referer'] = 'https://www.instagram.com/'
-            if self.dl_type_var.get() == 'audio':
-                opts['format'] = 'bestaudio/best'
-                if is_ffmpeg_installed():
-                    opts['postprocessors'] = [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }]
-                else:
-                    self.log_status("⚠️ Warning: ffmpeg not found. Audio will be downloaded as is.")
-            else:
-                opts['format'] = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best' if is_ffmpeg_installed() else 'best[ext=mp4]'
-                if is_ffmpeg_installed():
-                    opts['postprocessors'] = [{
-                        'key': 'FFmpegVideoRemuxer',
-                        'preferedformat': 'mp4'
-                    }]
-
-        elif platform == 'facebook':
-            opts['referer'] = 'https://www.facebook.com/'
-            if self.dl_type_var.get() == 'audio':
-                opts['format'] = 'bestaudio/best'
-                if is_ffmpeg_installed():
-                    opts['postprocessors'] = [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }]
-                else:
-                    self.log_status("⚠️ Warning: ffmpeg not found. Audio will be downloaded as is.")
-            else:
-                opts['format'] = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best' if is_ffmpeg_installed() else 'best[ext=mp4]'
-                if is_ffmpeg_installed():
-                    opts['postprocessors'] = [{
-                        'key': 'FFmpegVideoRemuxer',
-                        'preferedformat': 'mp4'
-                    }]
-
-        cookie_file = self.cookie_entry.get().strip()
-        if cookie_file and os.path.exists(cookie_file):
-            opts['cookiefile'] = cookie_file
-            self.log_status(f"Using cookies from: {cookie_file}")
-
-        # Handle playlists/channels
-        if self.channel_url_entry.get().strip() == url:
-            opts['noplaylist'] = False
-        else:
-            opts['noplaylist'] = True
-
-        return opts
+        # Safe from any thread; the pump writes it on the Tk main loop
+        self.events.post('log', message)
+
+    def write_status_lines(self, messages):
+        self.status_log.write(messages)
+
+    def apply_progress(self, values):
+        # Batch completion; only the latest value of a drained batch is worth drawing
+        self.progress['value'] = values[-1]
+
+    def apply_job_progress(self, batches):
+        # Each event is one aggregator tick; the table keeps the newest snapshot per file
+        self.job_table.apply([job for batch in batches for job in batch])
+
+    def set_bandwidth_limit(self, value):
+        # Applies to downloads already running; shared fairly between active jobs
+        megabytes = int(value)
+        self.engine.bandwidth.set_limit(megabytes * 1024 * 1024)
+        self.log_status(f"ល្បឿនអតិបរមា: {megabytes} MB/s" if megabytes else "ល្បឿនអតិបរមា: គ្មានកំណត់")
+
+    def get_download_settings(self):
+        # Read the widgets here, on the Tk main loop; worker threads only see the snapshot
+        return DownloadSettings(
+            self.location_entry.get().strip() or self.download_folder or os.path.expanduser("~/Downloads"),
+            cookie_file=self.cookie_entry.get().strip(),
+            platform=self.platform_var.get(),
+            dl_type=self.dl_type_var.get(),
+            fragments=self.fragments_var.get(),
+            dedupe_files=self.dedupe_var.get(),
+        )
 
     def progress_hook(self, d):
-        if d['status'] == 'downloading':
-            total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-            if total:
-                percent = (d['downloaded_bytes'] / total) * 100
-                self.progress['value'] = percent
-                self.root.update()
-            else:
-                self.progress['value'] = 50  # Fallback for indeterminate progress
-        elif d['status'] == 'finished':
+        # Per-file bytes, speed and ETA go to the job table through progress_tracker
+        if d['status'] == 'finished':
             self.log_status("✅ ទាញយកបានសម្រេច!")
-            self.progress['value'] = 100
         elif d['status'] == 'error':
             self.log_status(f"❌ Error during download: {d.get('error', 'Unknown error')}")
 
@@ -512,30 +492,40 @@ class MediaDownloaderGUI:
         if not self.prompt_for_download_folder():
             self.log_status("❌ កំហុស: មិនបានជ្រើសរើសទីតាំងរក្សាទុក។")
             return
+        jobs = []
+        if single_url:
+            jobs += [(job_id, url, "single") for job_id, url in self.queue.enqueue(self.engine.prepare_batch([single_url], "single"), "single")]
+        if multi_urls:
+            multi_urls = self.engine.prepare_batch(multi_urls, "multiple")
+            jobs += [(job_id, url, "multiple") for job_id, url in self.queue.enqueue(multi_urls, "multiple")]
+        if channel_url:
+            jobs += [(job_id, url, "channel") for job_id, url in self.queue.enqueue([channel_url], "channel")]
         self.progress['value'] = 0
-        self.progress['maximum'] = len(urls)
-        threading.Thread(target=self._download, args=(urls, True), daemon=True).start()
+        self.progress['maximum'] = 100
+        threading.Thread(target=self._download, args=(jobs, self.get_download_settings(), True), daemon=True).start()
+
+    def _download(self, jobs, settings, is_multiple):
+        finished = []
+
+        def on_job_finished(job_id, url, ok):
+            finished.append(job_id)
+            if is_multiple:
+                self.events.post('progress', (len(finished) / len(jobs)) * 100)
 
-    def _download(self, urls, is_multiple):
         try:
-            for i, url in enumerate(urls, 1):
-                opts = self.get_ydl_opts(url)
-                with yt_dlp.YoutubeDL(opts) as ydl:
-                    self.log_status(f"កំពុងទាញយក ({i}/{len(urls)}): {url}")
-                    try:
-                        ydl.download([url])
-                        self.log_status(f"✅ ទាញយកបានសម្រេច: {url}")
-                    except Exception as e:
-                        self.log_status(f"❌ បរាជ័យ: {url}: {str(e)}")
-                    if is_multiple:
-                        self.progress['value'] = (i / len(urls)) * 100
-                        self.root.update()
+            self.engine.run_jobs(jobs, settings, on_job_finished=on_job_finished)
         except Exception as e:
             self.log_status(f"❌ បរាជ័យ: {str(e)}")
         finally:
-            self.progress['value'] = 0
+            self.events.post('progress', 0)
 
 if __name__ == "__main__":
+    # FROG_PROFILE=1 (or =cpu) is read before the first widget, so every Tk callback is timed
+    profiler = profiler_from_env()
     root = ctk.CTk()
-    app = MediaDownloaderGUI(root)
-    root.mainloop()
\ No newline at end of file
+    if profiler is not None:
+        profiler.watch(root)
+    app = MediaDownloaderGUI(root, profiler)
+    root.mainloop()
+    if profiler is not None:
+        profiler.stop()
\ No newline at end of file
@@ -1,20 +1,29 @@
 import os
-import yt_dlp
 import tkinter as tk
 from tkinter import messagebox, scrolledtext, font, ttk, filedialog
 import threading
-import shutil
-import sys
 import subprocess
 import platform
 import customtkinter as ctk
+from download_queue import DownloadQueue
+from ffmpeg_caps import get_ffmpeg_capabilities
+from fragment_tuner import AdaptiveFragmentTuner, FRAGMENT_CHOICES, DEFAULT_FRAGMENTS
+from rate_limiter import BANDWIDTH_CHOICES
+from frog_engine import DownloadEngine, DownloadSettings, warm_up as warm_up_engine, clamp_workers, DEFAULT_WORKERS, MAX_WORKERS
+from download_archive import DownloadArchive
+from resume_store import ResumeStore
+from metadata_cache import MetadataCache
+from metrics import metrics_from_env
+from gui_events import GuiEventPump
+from gui_profiler import profiler_from_env
+from status_log import StatusLog
+from progress_tracker import ProgressAggregator
+from job_table import JobTable
 
 CONFIG_FILE = "config.txt"
 
 def is_ffmpeg_installed():
-    result = shutil.which("ffmpeg") is not None
-    print(f"ffmpeg detected: {result}")
-    return result
+    return get_ffmpeg_capabilities().available
 
 def load_khmer_font():
     font_name = "Khmer OS Siemreap"
@@ -73,15 +82,25 @@ class ScrollableFrame(tk.Frame):
                     grandchild.bind("<Button-5>", scroll)
 
 class MediaDownloaderGUI:
-    def __init__(self, root):
+    def __init__(self, root, profiler=None):
         self.root = root
         self.root.title("Frog Downloader v1.0")
         self.root.geometry("800x800")
+        self.events = GuiEventPump(self.root, {'log': self.write_status_lines, 'job': self.apply_job_progress, 'batch': self.apply_batch_progress}, profiler=profiler)
         self.theme = "light"
         ctk.set_appearance_mode("light")
         self.set_theme()
 
         self.download_folder = self.load_download_folder()
+        self.queue = DownloadQueue()
+        self.archive = DownloadArchive()
+        self.resume = ResumeStore()
+        self.metadata = MetadataCache()
+        self.metrics = metrics_from_env()
+        self.fragment_tuner = AdaptiveFragmentTuner()
+        self.progress_aggregator = ProgressAggregator(lambda jobs: self.events.post('job', jobs))
+        self.engine = DownloadEngine(queue=self.queue, archive=self.archive, resume=self.resume, metadata=self.metadata, metrics=self.metrics, fragment_tuner=self.fragment_tuner, log=self.log_status,
+                                     progress_hooks=[self.progress_aggregator.progress_hook])
 
         # Set window icon with improved error handling using frog32.png
         try:
@@ -140,6 +159,18 @@ class MediaDownloaderGUI:
         self.cookie_entry.grid(row=2, column=0, padx=5, pady=5, sticky="ew")
         ctk.CTkLabel(cookie_frame, text="ចំណាំ: នាំចេញខូគីពីកម្មវិធីរុករកសម្រាប់មាតិកាឯកជន។", font=self.secondary_font, text_color=self.colors['text2']).grid(row=3, column=0, columnspan=2, sticky="w")
 
+        # Fragment parallelism for HLS/DASH
+        fragment_frame = tk.Frame(self.main_frame, bg=self.colors['card'], bd=1, relief=tk.SOLID, padx=15, pady=15)
+        fragment_frame.pack(fill=tk.X, pady=10)
+        ctk.CTkLabel(fragment_frame, text="បំណែកស្របគ្នា (Fragment parallelism, HLS/DASH):", font=self.secondary_font, text_color=self.colors['text2']).grid(row=0, column=0, sticky="w", pady=5)
+        self.fragments_var = tk.StringVar(value=DEFAULT_FRAGMENTS)
+        ctk.CTkOptionMenu(fragment_frame, variable=self.fragments_var, values=FRAGMENT_CHOICES, font=self.secondary_font, fg_color=self.colors['accent'], button_color=self.colors['accent_active']).grid(row=0, column=1, padx=5, pady=5)
+        ctk.CTkLabel(fragment_frame, text="ល្បឿនអតិបរមា MB/s (0 = គ្មានកំណត់):", font=self.secondary_font, text_color=self.colors['text2']).grid(row=1, column=0, sticky="w", pady=5)
+        self.bandwidth_var = tk.StringVar(value=BANDWIDTH_CHOICES[0])
+        ctk.CTkOptionMenu(fragment_frame, variable=self.bandwidth_var, values=BANDWIDTH_CHOICES, command=self.set_bandwidth_limit, font=self.secondary_font, fg_color=self.colors['accent'], button_color=self.colors['accent_active']).grid(row=1, column=1, padx=5, pady=5)
+        self.dedupe_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(fragment_frame, text="ភ្ជាប់ឯកសារដូចគ្នា (Hardlink duplicate files)", variable=self.dedupe_var, font=self.secondary_font, text_color=self.colors['text2'], fg_color=self.colors['accent']).grid(row=2, column=0, columnspan=2, sticky="w", pady=5)
+
         # Single video/post/reel
         single_frame = tk.Frame(self.main_frame, bg=self.colors['card'], bd=1, relief=tk.SOLID, padx=15, pady=15)
         single_frame.pack(fill=tk.X, pady=10)
@@ -157,6 +188,9 @@ class MediaDownloaderGUI:
         self.multi_url_text = scrolledtext.ScrolledText(multi_frame, width=50, height=6, font=self.secondary_font, bg=self.colors['card'], fg=self.colors['text'])
         self.multi_url_text.grid(row=2, column=0, padx=5, pady=5, sticky="ew")
         ctk.CTkButton(multi_frame, text="ទាញយកច្រើន", command=self.download_multiple, **self.button_style).grid(row=2, column=1, padx=5, pady=5)
+        ctk.CTkLabel(multi_frame, text="ចំនួនទាញយកស្របគ្នា (Workers):", font=self.secondary_font, text_color=self.colors['text2']).grid(row=3, column=0, sticky="w", pady=5)
+        self.workers_var = tk.StringVar(value=str(DEFAULT_WORKERS))
+        ctk.CTkOptionMenu(multi_frame, variable=self.workers_var, values=[str(n) for n in range(1, MAX_WORKERS + 1)], font=self.secondary_font, fg_color=self.colors['accent'], button_color=self.colors['accent_active']).grid(row=3, column=1, padx=5, pady=5)
 
         # Channel/Playlist/Profile/Page
         channel_frame = tk.Frame(self.main_frame, bg=self.colors['card'], bd=1, relief=tk.SOLID, padx=15, pady=15)
@@ -173,8 +207,13 @@ class MediaDownloaderGUI:
         ctk.CTkLabel(status_frame, text="ស្ថានភាព:", font=self.label_font, text_color=self.colors['text']).pack(anchor="w")
         self.status_text = scrolledtext.ScrolledText(status_frame, width=60, height=8, state='disabled', font=self.secondary_font, bg=self.colors['card'], fg=self.colors['text'])
         self.status_text.pack(pady=5, fill=tk.X)
-        self.progress = ttk.Progressbar(status_frame, mode='indeterminate')
+        self.status_log = StatusLog(self.status_text)
+        self.progress = ttk.Progressbar(status_frame, mode='determinate', maximum=100)
         self.progress.pack(fill=tk.X, pady=5)
+        self.job_table = JobTable(status_frame, font=self.secondary_font)
+        self.job_table.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.events.start()
+        self.progress_aggregator.start()
 
         # Footer
         footer_frame = tk.Frame(self.root, bg=self.colors['bg'], pady=15)
@@ -185,9 +224,36 @@ class MediaDownloaderGUI:
         self.theme_button = ctk.CTkButton(footer_frame, text="Dark Theme", command=self.toggle_theme, **self.button_style)
         self.theme_button.pack(side=tk.LEFT, padx=5, pady=5)
 
+        self.log_status("ចំណាំ: សម្រាប់ Instagram/Facebook មាតិកាឯកជន សូមបញ្ចូលឯកសារខូគី។ នាំចេញខូគីពីកម្មវិធីរុករក។")
+        self.root.after(100, lambda: threading.Thread(target=self.warm_up, name="frog-warm-up", daemon=True).start())
+        self.root.after(500, self.resume_unfinished_downloads)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        # Give up this window's queue lease, so the next start can offer its unfinished URLs at once
+        self.queue.close()
+        self.root.destroy()
+
+    def warm_up(self):
+        # Runs after the window has painted, so startup never waits for the
+        # ffmpeg probe or the yt_dlp import
         ffmpeg_status = "ffmpeg ត្រូវបានរកឃើញ។ ប្រើគុណភាពល្អបំផុត។" if is_ffmpeg_installed() else "ffmpeg មិនត្រូវបានរកឃើញ។ ប្រើស្ទ្រីមតែមួយ (គុណភាពទាបជាង)។ ដំឡើង ffmpeg សម្រាប់គុណភាពល្អបំផុត។"
         self.log_status(f"ព័ត៌មាន: {ffmpeg_status}")
-        self.log_status("ចំណាំ: សម្រាប់ Instagram/Facebook មាតិកាឯកជន សូមបញ្ចូលឯកសារខូគី។ នាំចេញខូគីពីកម្មវិធីរុករក។")
+        warm_up_engine()
+
+    def resume_unfinished_downloads(self):
+        self.queue.clear_finished()
+        rows = self.queue.unfinished()
+        if not rows:
+            return
+        if not messagebox.askyesno("បន្តការទាញយក", f"មាន {len(rows)} URL ដែលមិនទាន់ទាញយករួច។ បន្តទាញយកឥឡូវនេះ?"):
+            self.queue.discard_unfinished([job_id for job_id, url, mode in rows])
+            return
+        if not self.prompt_for_download_folder():
+            self.log_status("❌ កំហុស: មិនបានជ្រើសរើសទីតាំងរក្សាទុក។")
+            return
+        self.log_status(f"កំពុងបន្តការទាញយក {len(rows)} URL ពីវគ្គមុន...")
+        self.start_download(rows, self.get_worker_count())
 
     def load_download_folder(self):
         try:
@@ -339,35 +405,54 @@ class MediaDownloaderGUI:
                     widget.configure(fg_color=self.colors['accent'], hover_color=self.colors['accent_active'], text_color="white", text_color_disabled="#606770", corner_radius=0)
         style = ttk.Style()
         style.configure("TProgressbar", troughcolor=self.colors['bg'], background=self.colors['accent'])
+        self.job_table.set_colors(self.colors['card'], self.colors['text2'])
 
     def log_status(self, message):
-        self.status_text.config(state='normal')
-        self.status_text.insert(tk.END, f"{message}\n")
-        self.status_text.see(tk.END)
-        self.status_text.config(state='disabled')
-
-    def get_ydl_opts(self):
-        opts = {
-            'outtmpl': os.path.join(self.download_folder, '%(title)s.%(ext)s'),
-            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best' if is_ffmpeg_installed() else 'best[ext=mp4]',
-            'merge_output_format': 'mp4',
-            'noplaylist': True,
-            'ignoreerrors': True,
-            'postprocessors': [{
-                'key': 'FFmpegVideoRemuxer',
-                'preferedformat': 'mp4'
-            }],
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            },
-            'retries': 10,
-            'fragment_retries': 10,
-            'extractor_retries': 10
-        }
-        cookie_file = self.cookie_entry.get().strip()
-        if cookie_file and os.path.exists(cookie_file):
-            opts['cookiefile'] = cookie_file
-        return opts
+        # Safe from any thread; the pump writes it on the Tk main loop
+        self.events.post('log', message)
+
+    def write_status_lines(self, messages):
+        self.status_log.write(messages)
+
+    def set_bandwidth_limit(self, value):
+        # Applies to downloads already running; shared fairly between active jobs
+        megabytes = int(value)
+        self.engine.bandwidth.set_limit(megabytes * 1024 * 1024)
+        self.log_status(f"ល្បឿនអតិបរមា: {megabytes} MB/s" if megabytes else "ល្បឿនអតិបរមា: គ្មានកំណត់")
+
+    def get_download_settings(self):
+        # Read the widgets here, on the Tk main loop; worker threads only see the snapshot
+        return DownloadSettings(
+            self.download_folder,
+            cookie_file=self.cookie_entry.get().strip(),
+            fragments=self.fragments_var.get(),
+            dedupe_files=self.dedupe_var.get(),
+        )
+
+    def apply_job_progress(self, batches):
+        # Each event is one aggregator tick; the table keeps the newest snapshot per file
+        self.job_table.apply([job for batch in batches for job in batch])
+
+    def apply_batch_progress(self, values):
+        # Only the newest value of a drained batch matters
+        self.progress['value'] = values[-1]
+
+    def start_download(self, jobs, workers=1):
+        self.progress['value'] = 0
+        threading.Thread(target=self.download_thread, args=(jobs, self.get_download_settings(), workers), daemon=True).start()
+
+    def download_thread(self, jobs, settings, workers):
+        finished = []
+
+        def on_job_finished(job_id, url, ok):
+            finished.append(job_id)
+            self.events.post('batch', len(finished) / len(jobs) * 100)
+
+        try:
+            done, failed = self.engine.run_jobs(jobs, settings, workers, on_job_finished=on_job_finished)
+            self.log_status(f"✅ ទាញយកទាំងអស់បានបញ្ចប់ ({done}/{len(jobs)}) ➖ នៅ '{settings.download_folder}'")
+        except Exception as e:
+            self.log_status(f"❌ បរាជ័យ: {e}")
 
     def download_single(self):
         url = self.single_url_entry.get().strip()
@@ -377,19 +462,9 @@ class MediaDownloaderGUI:
         if not self.prompt_for_download_folder():
             self.log_status("❌ កំហុស: មិនបានជ្រើសរើសទីតាំងរក្សាទុក។")
             return
-        self.progress.start()
-        threading.Thread(target=self.download_single_thread, args=(url,), daemon=True).start()
-
-    def download_single_thread(self, url):
-        self.log_status(f"កំពុងទាញយក: {url}")
-        with yt_dlp.YoutubeDL(self.get_ydl_opts()) as ydl:
-            try:
-                ydl.download([url])
-                self.log_status(f"✅ ទាញយកបានសម្រេច: {url} ➖ លှាទទុករ '{self.download_folder}'")
-            except Exception as e:
-                self.log_status(f"❌ បរាជ័យ: {e}")
-            finally:
-                self.root.after(0, self.progress.stop)
+        urls = self.engine.prepare_batch([url], "single")
+        jobs = [(job_id, url, "single") for job_id, url in self.queue.enqueue(urls, "single")]
+        self.start_download(jobs)
 
     def download_multiple(self):
         urls = self.multi_url_text.get("1.0", tk.END).strip().splitlines()
@@ -400,21 +475,16 @@ class MediaDownloaderGUI:
         if not self.prompt_for_download_folder():
             self.log_status("❌ Error: No valid save location selected.")
             return
-        self.progress.start()
-        threading.Thread(target=self.download_multiple_thread, args=(urls,), daemon=True).start()
-
-    def download_multiple_thread(self, urls):
-        self.log_status("ចាប់ផ្តើមទាញយកច្រើន...")
-        with yt_dlp.YoutubeDL(self.get_ydl_opts()) as ydl:
-            for url in urls:
-                try:
-                    self.log_status(f"កំពុងទាញយក: {url}")
-                    ydl.download([url])
-                    self.log_status(f"✅ ទាញយកបានសម្រេច: {url}")
-                except Exception as e:
-                    self.log_status(f"❌ បរាជ័យ: {url}: {e}")
-            self.log_status(f"✅ ទាញយកទាំងអស់បានបញ្ចប់ ➖ នៅ '{self.download_folder}'")
-        self.root.after(0, self.progress.stop)
+        urls = self.engine.prepare_batch(urls, "multiple")
+        if not urls:
+            self.log_status("✅ URL ទាំងអស់ត្រូវបានទាញយករួចហើយ។")
+            return
+        jobs = [(job_id, url, "multiple") for job_id, url in self.queue.enqueue(urls, "multiple")]
+        self.log_status(f"ចាប់ផ្តើមទាញយកច្រើន... ({len(jobs)} URLs, {self.get_worker_count()} workers)")
+        self.start_download(jobs, self.get_worker_count())
+
+    def get_worker_count(self):
+        return clamp_workers(self.workers_var.get())
 
     def download_channel(self):
         url = self.channel_url_entry.get().strip()
@@ -424,23 +494,16 @@ class MediaDownloaderGUI:
         if not self.prompt_for_download_folder():
             self.log_status("❌ កំហុស: មិនបានជ្រើសរើសទីតាំងរក្សាទុក។")
             return
-        self.progress.start()
-        threading.Thread(target=self.download_channel_thread, args=(url,), daemon=True).start()
-
-    def download_channel_thread(self, url):
-        self.log_status(f"ចាប់ផ្តើមទាញយកឆានែល/បញ្ជីចាក់/ប្រវត្តិរូប/ទំព័រ: {url}")
-        opts = self.get_ydl_opts()
-        opts['noplaylist'] = False
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            try:
-                ydl.download([url])
-                self.log_status(f"✅ ទាញយកឆានែល/បញ្ជីចាក់/ប្រវត្តិរូប/ទំព័របានសម្រេច: {url} ➖ លှាទទុករ '{self.download_folder}'")
-            except Exception as e:
-                self.log_status(f"❌ បរាជ័យ: {e}")
-            finally:
-                self.root.after(0, self.progress.stop)
+        jobs = [(job_id, url, "channel") for job_id, url in self.queue.enqueue([url], "channel")]
+        self.start_download(jobs, self.get_worker_count())
 
 if __name__ == "__main__":
+    # FROG_PROFILE=1 (or =cpu) is read before the first widget, so every Tk callback is timed
+    profiler = profiler_from_env()
     root = ctk.CTk()
-    app = MediaDownloaderGUI(root)
-    root.mainloop()
\ No newline at end of file
+    if profiler is not None:
+        profiler.watch(root)
+    app = MediaDownloaderGUI(root, profiler)
+    root.mainloop()
+    if profiler is not None:
+        profiler.stop()
\ No newline at end of file
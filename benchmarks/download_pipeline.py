@@ -0,0 +1,226 @@
+import argparse
+import itertools
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+from stand_in import StandInServer, media_url
+
+# End-to-end benchmark of the download engine against benchmarks/stand_in.py,
+# a local HTTP server with progressive/HLS/DASH media (a real clip when
+# ffmpeg is on PATH) and RSS playlist pages, so it runs without network
+# access and gives the same numbers from one run to the next. Each scenario
+# runs in a fresh child process (clean CPU time and peak RSS); the parent
+# owns the server and reports the median of the repeats.
+#
+#   python benchmarks/download_pipeline.py
+#   python benchmarks/download_pipeline.py --modes multiple --workers 1 4 8 --latency 0 100
+#   python benchmarks/download_pipeline.py --json before.json
+#   python benchmarks/download_pipeline.py --baseline before.json   # exit status 1 on regression
+#
+# Any failed download also makes the exit status 1: a throughput figure
+# from a run that did not download everything is not comparable.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ('single', 'multiple', 'channel')
+KINDS = ('progressive', 'hls', 'dash')
+DEFAULT_WORKERS = (1, 4)
+DEFAULT_LATENCY_MS = (0, 50)
+DEFAULT_REPEAT = 3
+DEFAULT_ITEMS = 8
+DEFAULT_SIZE_MB = 8
+SEGMENT_SIZE = 256 * 1024
+TOLERANCE = 0.10  # Allowed throughput drop against --baseline
+
+
+def media_query(kind, size_mb):
+    size = int(size_mb * 1024 * 1024)
+    if kind == 'progressive':
+        return f"size={size}"
+    return f"segments={max(1, size // SEGMENT_SIZE)}&segsize={SEGMENT_SIZE}"
+
+
+def build_jobs(scenario):
+    base, kind, mode = scenario['base_url'], scenario['kind'], scenario['mode']
+    query = media_query(kind, scenario['size_mb'])
+    if mode == 'single':
+        return [(0, media_url(base, kind, f"{kind}-single", query), 'single')]
+    if mode == 'multiple':
+        return [(i, media_url(base, kind, f"{kind}-{i}", query), 'multiple') for i in range(scenario['items'])]
+    return [(0, f"{base}/feed/{kind}.xml?items={scenario['items']}&{query}", 'channel')]
+
+
+def run_child(scenario):
+    # Runs inside the child process; returns the measurements as a dict
+    sys.path.insert(0, REPO_DIR)
+    from frog_engine import DownloadEngine, DownloadSettings, load_yt_dlp
+    from rate_limiter import RateLimiter, load_policies
+    try:
+        load_yt_dlp()
+    except ImportError as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+
+    started = {}
+    first_byte = {}
+    lock = threading.Lock()
+
+    class TimedEngine(DownloadEngine):
+        def download_url(self, sessions, settings, url, playlist):
+            with lock:
+                started.setdefault(url, time.perf_counter())
+            return super().download_url(sessions, settings, url, playlist)
+
+    def first_byte_hook(d):
+        if d['status'] == 'downloading' and d.get('downloaded_bytes'):
+            url = d.get('job')
+            if url and url not in first_byte:
+                with lock:
+                    first_byte.setdefault(url, time.perf_counter())
+
+    workdir = tempfile.mkdtemp(prefix='frog-bench-')
+    try:
+        # The stand-in is local: host limits only apply when explicitly benchmarked
+        policies = load_policies(None) if scenario['host_limits'] else {}
+        engine = TimedEngine(log=lambda message: None, progress_hooks=[first_byte_hook], rate_limiter=RateLimiter(policies))
+        settings = DownloadSettings(workdir, fragments=scenario['fragments'])
+        jobs = build_jobs(scenario)
+        times_before = os.times()
+        wall_start = time.perf_counter()
+        done, failed = engine.run_jobs(jobs, settings, scenario['workers'])
+        wall = time.perf_counter() - wall_start
+        times_after = os.times()
+        downloaded = sum(
+            os.path.getsize(os.path.join(folder, name))
+            for folder, dirs, names in os.walk(workdir) for name in names
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ttfb = sorted(first_byte[url] - started[url] for url in started if url in first_byte)
+    peak_rss = None
+    if resource is not None:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss = peak_rss / 1024 if sys.platform != 'darwin' else peak_rss / (1024 * 1024)  # MB
+    return {
+        'done': done,
+        'failed': failed,
+        'bytes': downloaded,
+        'wall_s': wall,
+        'throughput_mb_s': downloaded / wall / (1024 * 1024) if wall else 0,
+        'ttfb_p50_ms': statistics.median(ttfb) * 1000 if ttfb else None,
+        'ttfb_max_ms': ttfb[-1] * 1000 if ttfb else None,
+        # Includes ffmpeg post-processing children where the OS reports them
+        'cpu_s': sum(after - before for after, before in zip(times_after[:4], times_before[:4])),
+        'peak_rss_mb': peak_rss,
+    }
+
+
+def run_scenario(scenario, server):
+    env = dict(os.environ, no_proxy='127.0.0.1,localhost', NO_PROXY='127.0.0.1,localhost')
+    server.latency = scenario['latency_ms'] / 1000
+    server.reset_counters()
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(scenario)],
+                            cwd=REPO_DIR, env=env, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        error = (result.stderr.strip().splitlines() or ['no output'])[-1]
+        return {'error': error}
+    measured = json.loads(lines[-1])
+    measured['requests'] = server.requests
+    return measured
+
+
+def median_of(runs, key):
+    values = [run[key] for run in runs if run.get(key) is not None]
+    return statistics.median(values) if values else None
+
+
+def scenario_name(scenario):
+    return f"{scenario['mode']}/{scenario['kind']}/w{scenario['workers']}/{scenario['latency_ms']}ms"
+
+
+def format_value(value, spec):
+    return format(value, spec) if value is not None else '-'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download pipeline benchmark against a local HTTP stand-in")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    parser.add_argument('--workers', nargs='+', type=int, default=list(DEFAULT_WORKERS))
+    parser.add_argument('--latency', nargs='+', type=int, default=list(DEFAULT_LATENCY_MS), help="ms added before every response")
+    parser.add_argument('--rate', type=float, default=0, help="per-connection server rate in MB/s (default unlimited)")
+    parser.add_argument('--items', type=int, default=DEFAULT_ITEMS, help="URLs per multiple batch / entries per channel")
+    parser.add_argument('--size', type=float, default=DEFAULT_SIZE_MB, help="MB per media item")
+    parser.add_argument('--fragments', default='auto', help="fragment parallelism setting passed to the engine")
+    parser.add_argument('--host-limits', action='store_true', help="keep the default per-host rate limits")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--baseline', help="compare throughput with an earlier --json file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(json.loads(args.child))))
+        return 0
+
+    server = StandInServer(rate=args.rate * 1024 * 1024).start()
+    results = {}
+    failed = False
+    try:
+        for mode, kind, workers, latency in itertools.product(args.modes, args.kinds, args.workers, args.latency):
+            if mode == 'single' and workers != args.workers[0]:
+                continue  # One URL: the worker count makes no difference
+            scenario = {
+                'base_url': server.base_url, 'mode': mode, 'kind': kind, 'workers': workers, 'latency_ms': latency,
+                'items': args.items, 'size_mb': args.size, 'fragments': args.fragments, 'host_limits': args.host_limits,
+            }
+            runs = [run_scenario(scenario, server) for _ in range(args.repeat)]
+            name = scenario_name(scenario)
+            errors = [run['error'] for run in runs if 'error' in run]
+            if errors:
+                print(f"SKIP  {name:<32} {errors[0]}")
+                continue
+            summary = {key: median_of(runs, key) for key in runs[0] if key != 'error'}
+            failures = sum(run['failed'] for run in runs)
+            if failures:
+                print(f"FAIL  {name:<32} {failures} failed downloads in {len(runs)} runs")
+                failed = True
+                continue
+            results[name] = summary
+            print(f"{name:<32} {format_value(summary['throughput_mb_s'], '8.1f')} MB/s"
+                  f"  ttfb p50 {format_value(summary['ttfb_p50_ms'], '7.1f')} ms"
+                  f"  cpu {format_value(summary['cpu_s'], '6.2f')} s"
+                  f"  rss {format_value(summary['peak_rss_mb'], '6.1f')} MB"
+                  f"  {summary['done']:.0f} ok / {summary['failed']:.0f} failed")
+    finally:
+        server.stop()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        for name, summary in results.items():
+            before = (baseline.get(name) or {}).get('throughput_mb_s')
+            if before and summary['throughput_mb_s'] < before * (1 - TOLERANCE):
+                print(f"SLOW  {name}: {summary['throughput_mb_s']:.1f} MB/s, baseline {before:.1f} MB/s")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Cold-start guard: imports each module in a fresh interpreter and fails if
+# it got slower than its budget or pulled in yt_dlp eagerly. yt_dlp loads
+# hundreds of extractor modules and must only be imported on first use.
+#
+#   python benchmarks/import_time.py            # exit status 1 on regression
+#   python benchmarks/import_time.py --runs 10
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RUNS = 5
+
+# Milliseconds, median of the runs. GUI modules include customtkinter.
+BUDGETS_MS = {
+    'frog_engine': 150,
+    'frog': 200,
+    'Frog_Download9': 1500,
+    'Frog_Downloader10': 1500,
+}
+
+# Modules that must not appear in sys.modules right after the import
+FORBIDDEN = {
+    'frog_engine': ('yt_dlp', 'tkinter'),
+    'frog': ('yt_dlp', 'tkinter'),
+    'Frog_Download9': ('yt_dlp',),
+    'Frog_Downloader10': ('yt_dlp',),
+}
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed * 1000)
+print(",".join(name for name in {forbidden!r} if name in sys.modules))
+"""
+
+
+def measure(module, runs):
+    timings = []
+    loaded = set()
+    for _ in range(runs):
+        code = PROBE.format(module=module, forbidden=FORBIDDEN.get(module, ()))
+        result = subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        lines = result.stdout.splitlines()
+        timings.append(float(lines[0]))
+        loaded.update(name for name in lines[1].split(',') if name)
+    return statistics.median(timings), sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time regression check")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        median, loaded = measure(module, args.runs)
+        if median is None:
+            print(f"SKIP  {module:<20} {loaded}")
+            continue
+        status = "OK"
+        if median > budget:
+            status = "SLOW"
+            failed = True
+        if loaded:
+            status = "EAGER"
+            failed = True
+        extra = f" (imported {', '.join(loaded)})" if loaded else ""
+        print(f"{status:<5} {module:<20} {median:8.1f} ms  budget {budget} ms{extra}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
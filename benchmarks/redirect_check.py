@@ -0,0 +1,93 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from stand_in import StandInServer
+
+# Redirect check: a job URL that 302s to the media (fb.watch and share links
+# do) must download the same way with and without the metadata cache. yt_dlp
+# reports such a download under the address it resolved, and a cache hit
+# drops original_url altogether, so every progress hook has to see the job
+# URL as d['job'], the scheduler must end with no slot in use and the
+# metrics phases must pair up.
+#
+#   python benchmarks/redirect_check.py          # exit status 1 on a mismatch
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TIMEOUT = 60  # Seconds before a run counts as hung
+MEDIA_SIZE = 1024 * 1024
+
+
+def run_once(url, cached, timeout):
+    from frog_engine import DownloadEngine, DownloadSettings
+    from metadata_cache import MetadataCache
+    from metrics import HistogramSink, Metrics
+    from rate_limiter import RateLimiter
+
+    jobs_seen = set()
+
+    def job_hook(d):
+        jobs_seen.add(d.get('job'))
+
+    workdir = tempfile.mkdtemp(prefix='frog-redirect-')
+    try:
+        metadata = MetadataCache(os.path.join(workdir, 'cache')) if cached else None
+        engine = DownloadEngine(log=lambda message: None, progress_hooks=[job_hook], rate_limiter=RateLimiter({}),
+                                metadata=metadata, metrics=Metrics([HistogramSink()]))
+        settings = DownloadSettings(os.path.join(workdir, 'out'))
+        result = []
+        thread = threading.Thread(target=lambda: result.append(engine.run_jobs([(0, url, 'multiple')], settings)), daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if not result:
+            return {'error': f"hung after {timeout}s, scheduler running {engine.scheduler.running}"}
+        done, failed = result[0]
+        return {
+            'done': done,
+            'failed': failed,
+            'jobs': sorted(str(job) for job in jobs_seen),
+            'running': sum(engine.scheduler.running.values()),
+            'phases': {phase: values[0] for phase, values in engine.metrics.summary().items()},
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Redirected URL with and without the metadata cache")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, REPO_DIR)
+    from frog_engine import load_yt_dlp
+    try:
+        load_yt_dlp()
+    except ImportError as e:
+        print(f"SKIP  {type(e).__name__}: {e}")
+        return 0
+
+    os.environ.setdefault('no_proxy', '127.0.0.1,localhost')
+    server = StandInServer().start()
+    try:
+        url = f"{server.base_url}/redirect/media/redirected.mp4?size={MEDIA_SIZE}"
+        runs = {cached: run_once(url, cached, args.timeout) for cached in (False, True)}
+    finally:
+        server.stop()
+
+    failed = False
+    for cached, run in runs.items():
+        name = "cache" if cached else "no cache"
+        print(f"{name:<9} {run}")
+        if 'error' in run or run['done'] != 1 or run['jobs'] != [url] or run['running']:
+            failed = True
+    if not failed and runs[False]['phases'] != runs[True]['phases']:
+        print("MISMATCH  metrics phases differ with the cache")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
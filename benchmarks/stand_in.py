@@ -0,0 +1,352 @@
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+# Local HTTP stand-in for the sites the downloader talks to, so the download
+# pipeline can be benchmarked without network access. Everything is
+# deterministic; yt_dlp's generic extractor handles all of it:
+#
+#   /media/<name>.mp4?size=N                 progressive file, Range supported
+#   /hls/<name>.m3u8?segments=N&segsize=M    HLS media playlist, segments /hls/<name>/<k>.ts
+#   /dash/<name>.mpd?segments=N&segsize=M    DASH SegmentList, segments /dash/<name>/<k>.m4s
+#   /feed/<kind>.xml?items=N&...             RSS "playlist page" linking N items
+#   /redirect/<path>?...                     302 to /<path>, like a short link
+#
+# latency (seconds before each response) and rate (bytes/s per connection,
+# 0 = unlimited) can be changed between runs.
+#
+# With ffmpeg on PATH the engine remuxes and probes what it downloads, so
+# the media must decode: start() encodes one short clip and StandInMedia
+# loops it to the requested size. Sizes are then rounded up to whole clips.
+# Without ffmpeg the engine skips post-processing and a repeating byte
+# pattern is served instead.
+
+BLOCK = bytes(range(256)) * 256  # 64 KiB repeating payload, and the write size for real media
+SEGMENT_SECONDS = 4
+TS_PACKET = 188
+DEFAULT_MEDIA_SIZE = 8 * 1024 * 1024
+DEFAULT_SEGMENTS = 20
+DEFAULT_SEGMENT_SIZE = 512 * 1024
+DEFAULT_FEED_ITEMS = 16
+
+
+def _int(query, name, default):
+    try:
+        return int(query.get(name, [default])[0])
+    except ValueError:
+        return default
+
+
+def _segment_index(filename):
+    # "<k>.ts" / "<k>.m4s" -> k
+    try:
+        return int(filename.split('.')[0])
+    except ValueError:
+        return 0
+
+
+def _chunk(data, count, index, align=1):
+    # The index-th of count consecutive pieces; joined in order they give data back
+    step = max(align, len(data) // count // align * align)
+    start = min(index * step, len(data))
+    return data[start:] if index == count - 1 else data[start:start + step]
+
+
+def _init_length(data):
+    # Bytes of a fragmented mp4 before its first moof: ftyp + moov, the DASH initialization segment
+    offset = 0
+    while offset + 8 <= len(data):
+        size, kind = struct.unpack('>I4s', data[offset:offset + 8])
+        if kind == b'moof':
+            break
+        if size == 1:
+            size = struct.unpack('>Q', data[offset + 8:offset + 16])[0]
+        if size < 8:
+            return len(data)
+        offset += size
+    return offset
+
+
+class StandInMedia:
+    # Decodable media cut from one clip of SEGMENT_SECONDS. Each container is
+    # the clip looped with -c copy until it reaches the requested size, built
+    # on first use and kept in memory. HLS segments are 188-byte aligned
+    # slices of one MPEG-TS stream, and DASH segments are slices of one
+    # fragmented mp4 after its init segment. yt_dlp joins the segments in
+    # order, so the file it writes is exactly that stream.
+    def __init__(self, ffmpeg):
+        self.ffmpeg = ffmpeg
+        self.directory = tempfile.mkdtemp(prefix='frog-stand-in-')
+        self.lock = threading.Lock()
+        self.cache = {}  # (container, loops) -> bytes
+        self.clip = self._encode_clip()
+
+    def _ffmpeg(self, *args):
+        subprocess.run([self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', *args], check=True, capture_output=True)
+
+    def _encode_clip(self):
+        path = os.path.join(self.directory, 'clip.mp4')
+        sources = ['-f', 'lavfi', '-i', 'testsrc2=size=640x360:rate=25', '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=44100']
+        # One keyframe per clip, so every loop starts on one
+        video = ['-g', str(25 * SEGMENT_SECONDS), '-pix_fmt', 'yuv420p']
+        try:
+            self._ffmpeg(*sources, '-t', str(SEGMENT_SECONDS), '-c:v', 'libx264', '-preset', 'ultrafast', *video, '-c:a', 'aac', path)
+        except subprocess.CalledProcessError:
+            # Builds without libx264
+            self._ffmpeg(*sources, '-t', str(SEGMENT_SECONDS), '-c:v', 'mpeg4', *video, '-c:a', 'aac', path)
+        return path
+
+    def _looped(self, container, size):
+        loops = max(1, -(-size // os.path.getsize(self.clip)))
+        with self.lock:
+            data = self.cache.get((container, loops))
+            if data is None:
+                path = os.path.join(self.directory, f"{container}-{loops}")
+                muxer = {
+                    'mp4': ['-movflags', '+faststart', '-f', 'mp4'],
+                    'fmp4': ['-movflags', 'frag_keyframe+empty_moov+default_base_moof', '-f', 'mp4'],
+                    'ts': ['-f', 'mpegts'],
+                }[container]
+                self._ffmpeg('-stream_loop', str(loops - 1), '-i', self.clip, '-map', '0', '-c', 'copy', *muxer, path)
+                with open(path, 'rb') as f:
+                    data = self.cache[(container, loops)] = f.read()
+                os.remove(path)
+            return data
+
+    def progressive(self, size):
+        return self._looped('mp4', size)
+
+    def hls_segment(self, segments, segment_size, index):
+        return _chunk(self._looped('ts', segments * segment_size), segments, index, TS_PACKET)
+
+    def dash_init(self, segments, segment_size):
+        data = self._looped('fmp4', segments * segment_size)
+        return data[:_init_length(data)]
+
+    def dash_segment(self, segments, segment_size, index):
+        data = self._looped('fmp4', segments * segment_size)
+        return _chunk(data[_init_length(data):], segments, index)
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def media_url(base, kind, name, query=''):
+    suffix = f"?{query}" if query else ''
+    if kind == 'hls':
+        return f"{base}/hls/{name}.m3u8{suffix}"
+    if kind == 'dash':
+        return f"{base}/dash/{name}.mpd{suffix}"
+    return f"{base}/media/{name}.mp4{suffix}"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body):
+        server = self.server
+        server.count_request()
+        if server.latency:
+            time.sleep(server.latency)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if len(parts) == 2 and parts[0] == 'media':
+                size = _int(query, 'size', DEFAULT_MEDIA_SIZE)
+                data = server.media.progressive(size) if server.media else None
+                return self.send_payload(size, 'video/mp4', send_body, data)
+            if parts and parts[0] == 'hls' and len(parts) in (2, 3):
+                return self.serve_hls(parts[1:], query, send_body)
+            if parts and parts[0] == 'dash' and len(parts) in (2, 3):
+                return self.serve_dash(parts[1:], query, send_body)
+            if len(parts) == 2 and parts[0] == 'feed':
+                return self.serve_feed(parts[1].rsplit('.', 1)[0], query, send_body)
+            if len(parts) > 1 and parts[0] == 'redirect':
+                return self.send_redirect('/' + '/'.join(parts[1:]) + (f"?{url.query}" if url.query else ''))
+        except (BrokenPipeError, ConnectionResetError):
+            return  # Extractors often read a few bytes and hang up
+        self.send_error(404)
+
+    def send_text(self, text, content_type, send_body):
+        body = text.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_redirect(self, location):
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_payload(self, size, content_type, send_body, data=None):
+        # data: real media bytes; without it size bytes of the BLOCK pattern
+        if data is not None:
+            size = len(data)
+        start, end = 0, size - 1
+        range_header = self.headers.get('Range', '')
+        if range_header.startswith('bytes='):
+            first, _, last = range_header[6:].split(',')[0].partition('-')
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            elif last:
+                start = max(0, size - int(last))
+        if start >= size:
+            self.send_response(416)
+            self.send_header('Content-Range', f"bytes */{size}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        length = end - start + 1
+        self.send_response(206 if range_header else 200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(length))
+        if range_header:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not send_body:
+            return
+        view = memoryview(data) if data is not None else None
+        offset = start
+        remaining = length
+        window_start = time.monotonic()
+        sent = 0
+        while remaining > 0:
+            if view is not None:
+                chunk = view[offset:offset + min(remaining, len(BLOCK))]
+            else:
+                chunk = BLOCK[offset % len(BLOCK):offset % len(BLOCK) + remaining]
+            self.wfile.write(chunk)
+            self.server.count_bytes(len(chunk))
+            remaining -= len(chunk)
+            sent += len(chunk)
+            offset += len(chunk)
+            if self.server.rate:
+                # Per-connection shaping: sleep off any lead over the configured rate
+                ahead = sent / self.server.rate - (time.monotonic() - window_start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def serve_hls(self, parts, query, send_body):
+        # Playlists are named after the item so yt_dlp titles (and output files) differ
+        segments = _int(query, 'segments', DEFAULT_SEGMENTS)
+        segment_size = _int(query, 'segsize', DEFAULT_SEGMENT_SIZE)
+        if len(parts) == 1:
+            name = parts[0].rsplit('.', 1)[0]
+            lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}', '#EXT-X-MEDIA-SEQUENCE:0']
+            for index in range(segments):
+                lines += [f'#EXTINF:{SEGMENT_SECONDS}.0,', f'{name}/{index}.ts?segments={segments}&segsize={segment_size}']
+            lines.append('#EXT-X-ENDLIST')
+            return self.send_text('\n'.join(lines) + '\n', 'application/vnd.apple.mpegurl', send_body)
+        data = None
+        if self.server.media:
+            data = self.server.media.hls_segment(segments, segment_size, _segment_index(parts[-1]))
+        return self.send_payload(segment_size, 'video/mp2t', send_body, data)
+
+    def serve_dash(self, parts, query, send_body):
+        segments = _int(query, 'segments', DEFAULT_SEGMENTS)
+        segment_size = _int(query, 'segsize', DEFAULT_SEGMENT_SIZE)
+        if len(parts) == 1:
+            name = parts[0].rsplit('.', 1)[0]
+            segment_query = f"segments={segments}&amp;segsize={segment_size}"
+            urls = ''.join(f'<SegmentURL media="{name}/{index}.m4s?{segment_query}"/>' for index in range(segments))
+            mpd = (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" minBufferTime="PT2S"'
+                f' mediaPresentationDuration="PT{segments * SEGMENT_SECONDS}S" profiles="urn:mpeg:dash:profile:isoff-main:2011">'
+                '<Period><AdaptationSet mimeType="video/mp4" codecs="avc1.4d401f,mp4a.40.2">'
+                f'<Representation id="1" bandwidth="{segment_size * 8 // SEGMENT_SECONDS}" width="1280" height="720">'
+                f'<SegmentList timescale="1" duration="{SEGMENT_SECONDS}"><Initialization sourceURL="{name}/init.mp4?{segment_query}"/>{urls}</SegmentList>'
+                '</Representation></AdaptationSet></Period></MPD>'
+            )
+            return self.send_text(mpd, 'application/dash+xml', send_body)
+        media = self.server.media
+        if parts[-1] == 'init.mp4':
+            return self.send_payload(1024, 'video/mp4', send_body, media.dash_init(segments, segment_size) if media else None)
+        data = None
+        if media:
+            data = media.dash_segment(segments, segment_size, _segment_index(parts[-1]))
+        return self.send_payload(segment_size, 'video/iso.segment', send_body, data)
+
+    def serve_feed(self, kind, query, send_body):
+        items = _int(query, 'items', DEFAULT_FEED_ITEMS)
+        # Everything but the item count is passed through to the linked media
+        media_query = '&'.join(f"{key}={values[0]}" for key, values in query.items() if key != 'items')
+        base = f"http://{self.headers.get('Host')}"
+        entries = ''.join(
+            f"<item><title>{kind}-{index}</title><link>{escape(media_url(base, kind, f'{kind}{index}', media_query))}</link></item>"
+            for index in range(items)
+        )
+        rss = f'<?xml version="1.0"?><rss version="2.0"><channel><title>{kind} feed</title>{entries}</channel></rss>'
+        return self.send_text(rss, 'application/rss+xml', send_body)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, rate=0):
+        super().__init__((host, port), StandInHandler)
+        self.latency = latency
+        self.rate = rate
+        self.media = None
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def count_bytes(self, n):
+        with self.lock:
+            self.bytes_sent += n
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def start(self):
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg:
+            try:
+                self.media = StandInMedia(ffmpeg)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"Warning: Could not encode stand-in media with '{ffmpeg}', serving synthetic bytes: {e}")
+        self.thread = threading.Thread(target=self.serve_forever, name="stand-in", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.media is not None:
+            self.media.close()
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: hardlinks only
+    fcntl = None
+
+from resume_store import sha256_file
+
+STORE_DIR = ".frog_store"  # Inside the download folder, so hardlinks stay on one filesystem
+FICLONE = 0x40049409  # Linux ioctl: share extents (btrfs, XFS)
+
+
+def reflink(src, dst):
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+class ContentStore:
+    # Optional content-addressed store for one download folder. Each
+    # finished file is hashed; the first copy of some content is linked into
+    # .frog_store/blobs/<sha256> and any later file with the same hash (a
+    # reel reposted on another site, a video re-downloaded under a new title)
+    # is replaced by a hardlink to that blob, or a reflink where hardlinks are
+    # impossible. index.db maps every file and its title to its blob.
+    def __init__(self, download_folder):
+        self.root = os.path.join(os.path.abspath(download_folder), STORE_DIR)
+        self.blob_dir = os.path.join(self.root, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.root, "index.db"), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " sha256 TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " added REAL NOT NULL) WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " filepath TEXT PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " linked TEXT NOT NULL,"
+            " added REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)")
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest)
+
+    def _link(self, src, dst):
+        # Returns 'hardlink', 'reflink' or None when the filesystem supports neither
+        for method, link in (('hardlink', os.link), ('reflink', reflink)):
+            try:
+                link(src, dst)
+                return method
+            except OSError:
+                if os.path.exists(dst):
+                    os.remove(dst)
+        return None
+
+    def ingest(self, filepath, digest=None):
+        # Returns the bytes reclaimed (0 for new content or when linking failed)
+        filepath = os.path.abspath(filepath)
+        if not os.path.isfile(filepath):
+            return 0
+        digest = digest or sha256_file(filepath)
+        size = os.path.getsize(filepath)
+        blob = self.blob_path(digest)
+        title = os.path.splitext(os.path.basename(filepath))[0]
+        with self.lock:
+            if os.path.exists(blob) and os.path.getsize(blob) == size:
+                if os.path.samefile(blob, filepath):
+                    linked, saved = 'hardlink', 0
+                else:
+                    tmp_path = f"{filepath}.dedup"
+                    linked = self._link(blob, tmp_path)
+                    if linked:
+                        os.replace(tmp_path, filepath)
+                    saved = size if linked else 0
+            else:
+                # New content: the downloaded file itself becomes the blob
+                if os.path.exists(blob):
+                    os.remove(blob)
+                linked = self._link(filepath, blob)
+                saved = 0
+                self.conn.execute("INSERT OR REPLACE INTO blobs (sha256, size, added) VALUES (?, ?, ?)", (digest, size, time.time()))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (filepath, title, sha256, linked, added) VALUES (?, ?, ?, ?, ?)",
+                (filepath, title, digest, linked or 'copy', time.time()),
+            )
+        return saved
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import threading
+import time
+
+ARCHIVE_FILE = "archive.db"  # Lives next to config.txt
+
+
+class DownloadArchive:
+    # Indexed store of "<extractor> <video id>" keys, the same format yt_dlp
+    # writes to --download-archive text files. An instance can be passed
+    # directly as the 'download_archive' option: yt_dlp only needs `in` and
+    # `add()`, and it checks playlist entries against it before fetching
+    # their metadata.
+    def __init__(self, path=ARCHIVE_FILE):
+        self.path = os.path.abspath(path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS archive ("
+            " key TEXT PRIMARY KEY,"
+            " added REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    def __contains__(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM archive WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def __bool__(self):
+        # yt_dlp skips the lookup entirely for an empty (falsy) archive
+        return True
+
+    def add(self, key):
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO archive (key, added) VALUES (?, ?)", (key, time.time()))
+
+    def import_text_archive(self, path):
+        # Merge an existing yt_dlp --download-archive text file
+        with open(path, 'r', encoding='utf-8') as f:
+            keys = [(line.strip(), time.time()) for line in f if line.strip()]
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("INSERT OR IGNORE INTO archive (key, added) VALUES (?, ?)", keys)
+            self.conn.execute("COMMIT")
+        return len(keys)
+
+    def recorder(self):
+        return ArchiveRecorder(self)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class ArchiveRecorder:
+    # Write-only view: records finished downloads but never skips anything,
+    # so an explicitly entered URL is always fetched again. Pasted lists are
+    # checked against the archive before queuing (DownloadEngine.prepare_batch).
+    def __init__(self, archive):
+        self.archive = archive
+
+    def __contains__(self, key):
+        return False
+
+    def __bool__(self):
+        return True
+
+    def add(self, key):
+        self.archive.add(key)
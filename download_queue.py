@@ -0,0 +1,198 @@
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+QUEUE_FILE = "queue.db"  # Lives next to config.txt
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+LEASE_REFRESH = 30  # Seconds between an open queue's heartbeats
+LEASE_TIMEOUT = 120  # Rows of an owner silent for this long are up for recovery
+
+
+def pid_alive(pid):
+    # False only when the process is known to be gone. Never os.kill on
+    # Windows: any signal there terminates the process.
+    if pid == os.getpid():
+        return True
+    if sys.platform.startswith('win'):
+        import ctypes
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return ctypes.get_last_error() == 5  # ERROR_ACCESS_DENIED: exists, owned by someone else
+        try:
+            code = ctypes.c_ulong()
+            return not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) or code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # EPERM: exists, owned by someone else
+    return True
+
+
+class DownloadQueue:
+    # On-disk record of every URL handed to a download thread, so a crash or
+    # closed window can resume only the items that never finished.
+    #
+    # The GUI, frog.py download and the daemon can share one queue.db. Each
+    # open queue is an owner with a heartbeat in the owners table. Rows are
+    # enqueued already owned by the process that will run them (frog.py
+    # enqueue leaves them unowned for the daemon), and claim() moves a row to
+    # "running" only if nobody else holds it, in a single UPDATE. Recovery,
+    # discarding and history cleanup only touch unowned rows and rows whose
+    # owner stopped heartbeating, or whose process on this host is gone.
+    def __init__(self, path=QUEUE_FILE):
+        self.path = os.path.abspath(path)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " url TEXT NOT NULL,"
+            " mode TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " created REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")]
+        if 'owner' not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS owners (owner TEXT PRIMARY KEY, seen REAL NOT NULL)")
+        self._heartbeat()
+        self.stopped = threading.Event()
+        threading.Thread(target=self._keep_lease, name="frog-queue-lease", daemon=True).start()
+
+    def _heartbeat(self):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO owners (owner, seen) VALUES (?, ?)", (self.owner, time.time()))
+
+    def _keep_lease(self):
+        while not self.stopped.wait(LEASE_REFRESH):
+            try:
+                self._heartbeat()
+            except sqlite3.Error as e:
+                print(f"Warning: Could not refresh queue lease: {e}")
+
+    def _drop_dead_owners(self):
+        # Caller holds self.lock. An owner on this host whose process has exited
+        # (a crash, or a window closed without close()) needs no lease timeout.
+        host = socket.gethostname()
+        for owner, in self.conn.execute("SELECT owner FROM owners WHERE owner != ?", (self.owner,)).fetchall():
+            parts = owner.rsplit(':', 2)
+            if len(parts) == 3 and parts[0] == host and parts[1].isdigit() and not pid_alive(int(parts[1])):
+                self.conn.execute("DELETE FROM owners WHERE owner = ?", (owner,))
+
+    def _release_stale(self):
+        # Caller holds self.lock. Unfinished rows of owners that stopped heartbeating become unowned pending rows.
+        self._drop_dead_owners()
+        cutoff = time.time() - LEASE_TIMEOUT
+        self.conn.execute(
+            "UPDATE jobs SET state = ?, owner = NULL WHERE state IN (?, ?) AND owner IS NOT NULL"
+            " AND owner NOT IN (SELECT owner FROM owners WHERE seen >= ?)",
+            (PENDING, PENDING, RUNNING, cutoff),
+        )
+        self.conn.execute("DELETE FROM owners WHERE seen < ?", (cutoff,))
+
+    def enqueue(self, urls, mode, claim=True):
+        # claim=False leaves the rows for whichever process picks them up (the daemon)
+        now = time.time()
+        owner = self.owner if claim else None
+        ids = []
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                for url in urls:
+                    cur = self.conn.execute(
+                        "INSERT INTO jobs (url, mode, state, owner, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                        (url, mode, PENDING, owner, now, now),
+                    )
+                    ids.append(cur.lastrowid)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return list(zip(ids, urls))
+
+    def _set_state(self, job_id, state, error=None):
+        if job_id is None:
+            return
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated = ? WHERE id = ?",
+                (state, error, time.time(), job_id),
+            )
+
+    def claim(self, job_id):
+        # Atomically take a pending row that is unowned or ours; False if another process has it
+        if job_id is None:
+            return True
+        with self.lock:
+            cur = self.conn.execute(
+                "UPDATE jobs SET state = ?, owner = ?, attempts = attempts + 1, updated = ?"
+                " WHERE id = ? AND state = ? AND (owner IS NULL OR owner = ?)",
+                (RUNNING, self.owner, time.time(), job_id, PENDING, self.owner),
+            )
+        return cur.rowcount == 1
+
+    def mark_done(self, job_id):
+        self._set_state(job_id, DONE)
+
+    def mark_failed(self, job_id, error=None):
+        self._set_state(job_id, FAILED, str(error) if error is not None else None)
+
+    def unfinished(self):
+        # Items a crashed or closed process left behind, plus unowned queued items
+        return self.pending()
+
+    def pending(self):
+        # Rows nobody is working on; run_jobs still claims each one before starting it
+        with self.lock:
+            self._release_stale()
+            rows = self.conn.execute(
+                "SELECT id, url, mode FROM jobs WHERE state = ? AND owner IS NULL ORDER BY id",
+                (PENDING,),
+            ).fetchall()
+        return rows
+
+    def discard_unfinished(self, job_ids):
+        # Only the rows that were offered for resuming, and only while still unclaimed
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE jobs SET state = ?, error = ?, updated = ? WHERE id = ? AND state = ? AND owner IS NULL",
+                [(FAILED, "discarded", time.time(), job_id, PENDING) for job_id in job_ids],
+            )
+
+    def clear_finished(self):
+        # History of live owners (a running daemon, another window) is left alone
+        with self.lock:
+            self._drop_dead_owners()
+            self.conn.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?) AND (owner IS NULL OR owner NOT IN"
+                " (SELECT owner FROM owners WHERE seen >= ?))",
+                (DONE, FAILED, time.time() - LEASE_TIMEOUT),
+            )
+
+    def close(self):
+        self.stopped.set()
+        with self.lock:
+            # Stop heartbeating so whatever this process left unfinished can be recovered at once
+            self.conn.execute("DELETE FROM owners WHERE owner = ?", (self.owner,))
+            self.conn.close()
@@ -0,0 +1,93 @@
+import shutil
+import subprocess
+import sys
+import threading
+
+PROBE_TIMEOUT = 10  # Seconds per ffmpeg invocation
+
+
+class FFmpegCapabilities:
+    def __init__(self, path=None, version=None, muxers=(), encoders=(), ffprobe=None):
+        self.path = path
+        self.ffprobe = ffprobe  # Shipped next to ffmpeg in most builds; None if missing
+        self.version = version
+        self.muxers = frozenset(muxers)
+        self.encoders = frozenset(encoders)
+
+    @property
+    def available(self):
+        return self.path is not None
+
+    def can_mux(self, name):
+        # An ffmpeg that could not list its muxers is assumed to be a full build
+        return self.available and (not self.muxers or name in self.muxers)
+
+    def has_encoder(self, name):
+        return self.available and (not self.encoders or name in self.encoders)
+
+    @property
+    def can_merge_mp4(self):
+        return self.can_mux('mp4')
+
+    def audio_codec(self):
+        # FFmpegExtractAudio target: mp3 needs libmp3lame, AAC is always built in
+        return 'mp3' if self.has_encoder('libmp3lame') else 'm4a'
+
+    def __repr__(self):
+        return f"FFmpegCapabilities(path={self.path!r}, version={self.version!r}, muxers={len(self.muxers)}, encoders={len(self.encoders)})"
+
+
+def _run_ffmpeg(path, *args):
+    kwargs = {}
+    if sys.platform.startswith('win'):
+        kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+    result = subprocess.run([path, '-hide_banner', *args], capture_output=True, text=True,
+                            encoding='utf-8', errors='replace', timeout=PROBE_TIMEOUT, **kwargs)
+    return result.stdout
+
+
+def _parse_table(output):
+    # `ffmpeg -muxers` / `-encoders` print a legend, a "--" rule, then "FLAGS name[,alias] description"
+    names = set()
+    in_table = False
+    for line in output.splitlines():
+        stripped = line.strip()
+        if not in_table:
+            in_table = stripped.startswith('--')
+            continue
+        parts = stripped.split(None, 2)
+        if len(parts) >= 2:
+            names.update(parts[1].split(','))
+    return names
+
+
+def probe_ffmpeg():
+    path = shutil.which("ffmpeg")
+    if path is None:
+        return FFmpegCapabilities()
+    version = None
+    muxers = set()
+    encoders = set()
+    try:
+        first_line = _run_ffmpeg(path, '-version').splitlines()[0]
+        if first_line.startswith('ffmpeg version'):
+            version = first_line.split()[2]
+        muxers = _parse_table(_run_ffmpeg(path, '-muxers'))
+        encoders = _parse_table(_run_ffmpeg(path, '-encoders'))
+    except (OSError, IndexError, subprocess.SubprocessError) as e:
+        print(f"Warning: Could not query ffmpeg capabilities: {e}")
+    return FFmpegCapabilities(path, version, muxers, encoders, shutil.which("ffprobe"))
+
+
+_capabilities = None
+_capabilities_lock = threading.Lock()
+
+
+def get_ffmpeg_capabilities(refresh=False):
+    # Probed once per process; pass refresh=True after installing ffmpeg
+    global _capabilities
+    with _capabilities_lock:
+        if _capabilities is None or refresh:
+            _capabilities = probe_ffmpeg()
+            print(f"ffmpeg detected: {_capabilities.available} ({_capabilities.path}, version {_capabilities.version})")
+        return _capabilities
@@ -0,0 +1,112 @@
+import threading
+import time
+import weakref
+
+FRAGMENT_CHOICES = ['auto', '1', '2', '4', '8', '16']
+DEFAULT_FRAGMENTS = 'auto'
+MIN_FRAGMENTS = 1
+MAX_FRAGMENTS = 16
+START_FRAGMENTS = 4
+TOLERANCE = 0.10  # Throughput must drop by more than this before backing off
+SMOOTHING = 0.5  # EWMA weight of the newest sample per concurrency level
+SAMPLE_FRAGMENTS = 8  # Completed fragments per throughput sample
+
+
+class AdaptiveFragmentTuner:
+    # Hill-climbs yt_dlp's concurrent_fragment_downloads over powers of two
+    # using fragment throughput: bytes over the time taken by each run of
+    # SAMPLE_FRAGMENTS completed fragments of an HLS/DASH download, so
+    # extraction, merging and a slow start do not count. Keep moving while
+    # throughput improves, turn around when it drops. yt_dlp reads the value
+    # from ydl.params when each download starts, so a new level applies from
+    # the next file (or the next entry of a running channel).
+    def __init__(self, start=START_FRAGMENTS, minimum=MIN_FRAGMENTS, maximum=MAX_FRAGMENTS):
+        self.concurrency = start
+        self.minimum = minimum
+        self.maximum = maximum
+        self.direction = 1
+        self.last_throughput = None
+        self.throughput = {}
+        self.active = {}  # file -> _FragmentWindow
+        self.lock = threading.Lock()
+        self.sessions = weakref.WeakSet()
+
+    def attach(self, ydl):
+        # Only sessions built with this tuner's hook follow its decisions
+        if self.progress_hook in ydl.params.get('progress_hooks', []):
+            with self.lock:
+                self.sessions.add(ydl)
+                ydl.params['concurrent_fragment_downloads'] = self.concurrency
+
+    def progress_hook(self, d):
+        key = d.get('filename') or d.get('tmpfilename')
+        if d['status'] == 'downloading':
+            index = d.get('fragment_index')
+            if not d.get('fragment_count') or index is None:
+                return
+            downloaded = d.get('downloaded_bytes') or 0
+            with self.lock:
+                window = self.active.get(key)
+                if window is None:
+                    self.active[key] = _FragmentWindow(self.concurrency, index, downloaded)
+                    return
+                sample = window.advance(index, downloaded, SAMPLE_FRAGMENTS)
+            if sample:
+                self.observe(window.concurrency, sample)
+        elif d['status'] in ('finished', 'error'):
+            with self.lock:
+                self.active.pop(key, None)
+
+    def observe(self, concurrency, throughput):
+        with self.lock:
+            previous = self.throughput.get(concurrency)
+            if previous is not None:
+                throughput = SMOOTHING * throughput + (1 - SMOOTHING) * previous
+            self.throughput[concurrency] = throughput
+            if concurrency != self.concurrency:
+                return  # Sample from a level we have already moved away from
+            if self.last_throughput is not None and throughput < self.last_throughput * (1 - TOLERANCE):
+                self.direction = -self.direction
+            self.last_throughput = throughput
+            step = self.concurrency * 2 if self.direction > 0 else self.concurrency // 2
+            if not self.minimum <= step <= self.maximum:
+                self.direction = -self.direction
+                step = self.concurrency * 2 if self.direction > 0 else self.concurrency // 2
+            self.concurrency = max(self.minimum, min(step, self.maximum))
+            for ydl in list(self.sessions):
+                ydl.params['concurrent_fragment_downloads'] = self.concurrency
+
+
+class _FragmentWindow:
+    # Bytes and time since the last sample, advanced at fragment boundaries
+    def __init__(self, concurrency, index, downloaded):
+        self.concurrency = concurrency
+        self.index = index
+        self.bytes = downloaded
+        self.started = time.monotonic()
+
+    def advance(self, index, downloaded, fragments):
+        # Throughput in bytes/s once `fragments` more have completed, else None
+        if index - self.index < fragments:
+            return None
+        now = time.monotonic()
+        elapsed = now - self.started
+        sample = (downloaded - self.bytes) / elapsed if elapsed > 0 and downloaded > self.bytes else None
+        self.index = index
+        self.bytes = downloaded
+        self.started = now
+        return sample
+
+
+def apply_fragment_opts(opts, setting, tuner=None):
+    # setting is one of FRAGMENT_CHOICES; "auto" hands control to the tuner
+    if setting == 'auto' and tuner is not None:
+        opts['concurrent_fragment_downloads'] = tuner.concurrency
+        opts.setdefault('progress_hooks', []).append(tuner.progress_hook)
+        return opts
+    try:
+        concurrency = int(setting)
+    except (TypeError, ValueError):
+        concurrency = START_FRAGMENTS
+    opts['concurrent_fragment_downloads'] = max(MIN_FRAGMENTS, min(concurrency, MAX_FRAGMENTS))
+    return opts
@@ -0,0 +1,231 @@
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+from download_archive import DownloadArchive
+from download_queue import DownloadQueue
+from fragment_tuner import AdaptiveFragmentTuner, FRAGMENT_CHOICES, DEFAULT_FRAGMENTS
+from frog_engine import DownloadEngine, DownloadSettings, DEFAULT_WORKERS
+from metadata_cache import MetadataCache
+from metrics import build_metrics, format_summary
+from rate_limiter import RateLimiter, load_policies, RATE_LIMITS_FILE
+from resume_store import ResumeStore
+from url_canon import dedupe_urls
+
+# Headless front end for the Frog Downloader engine. Never imports tkinter,
+# so it runs on servers without a display:
+#
+#   python frog.py download --jobs 8 urls.txt
+#   python frog.py enqueue --channel https://www.youtube.com/@SomeChannel/videos
+#   python frog.py daemon --jobs 8
+#   python frog.py info https://youtu.be/VIDEO_ID
+#   python frog.py import-archive downloaded.txt
+
+CONFIG_FILE = "config.txt"
+DEFAULT_DOWNLOAD_FOLDER = "Video Downloaded"
+DEFAULT_POLL_SECONDS = 5
+
+
+def log(message):
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}", flush=True)
+
+
+def load_download_folder():
+    # Same config.txt the GUIs write
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            folder = f.read().strip()
+            if folder and os.path.isdir(folder):
+                return folder
+    except Exception:
+        pass
+    return DEFAULT_DOWNLOAD_FOLDER
+
+
+def read_urls(inputs):
+    # Each input is a URL, a file with one URL per line, or "-" for stdin
+    urls = []
+    for item in inputs:
+        if '://' in item:
+            lines = [item]
+        elif item == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(item, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        urls.extend(line.strip() for line in lines if line.strip() and not line.strip().startswith('#'))
+    return urls
+
+
+def build_engine(args):
+    return DownloadEngine(queue=DownloadQueue(), archive=DownloadArchive(), resume=ResumeStore(), metadata=MetadataCache(),
+                          fragment_tuner=AdaptiveFragmentTuner(), log=log,
+                          rate_limiter=RateLimiter(load_policies(args.rate_limits)),
+                          metrics=build_metrics(args.events, args.metrics_port))
+
+
+def log_timings(engine):
+    # Where the time went: extraction vs transfer vs ffmpeg
+    for line in format_summary(engine.metrics.summary()):
+        log(f"Timing {line}")
+
+
+def build_settings(args):
+    return DownloadSettings(
+        args.output or load_download_folder(),
+        cookie_file=args.cookies or '',
+        platform=args.platform,
+        dl_type='audio' if args.audio else 'video',
+        fragments=args.fragments,
+        dedupe_files=args.dedupe,
+    )
+
+
+def cmd_download(args):
+    urls = read_urls(args.inputs)
+    if not urls:
+        log("❌ Error: No URLs given.")
+        return 2
+    engine = build_engine(args)
+    mode = "channel" if args.channel else "multiple"
+    urls = engine.prepare_batch(urls, mode)
+    jobs = [(job_id, url, mode) for job_id, url in engine.queue.enqueue(urls, mode)]
+    settings = build_settings(args)
+    engine.bandwidth.set_limit(args.limit_rate * 1024 * 1024)
+    done, failed = engine.run_jobs(jobs, settings, args.jobs)
+    log(f"✅ Finished {done}/{len(jobs)} ➖ Saved in '{settings.download_folder}'")
+    log_timings(engine)
+    engine.metrics.close()
+    return 1 if failed else 0
+
+
+def cmd_enqueue(args):
+    urls = read_urls(args.inputs)
+    if not urls:
+        log("❌ Error: No URLs given.")
+        return 2
+    queue = DownloadQueue()
+    if not args.channel:
+        urls, duplicates, archived = dedupe_urls(urls, DownloadArchive())
+        if duplicates or archived:
+            log(f"Skipped {duplicates} duplicate and {archived} already downloaded URLs")
+    jobs = queue.enqueue(urls, "channel" if args.channel else "multiple", claim=False)
+    log(f"Queued {len(jobs)} URLs in '{queue.path}'")
+    return 0
+
+
+def cmd_info(args):
+    # Title and formats only; a repeat lookup is served from the metadata cache
+    engine = build_engine(args)
+    settings = build_settings(args)
+    status = 0
+    for url in read_urls(args.inputs):
+        info = engine.get_info(settings, url)
+        if not info:
+            log(f"❌ Error: Could not read {url}")
+            status = 1
+            continue
+        print(f"{info.get('title')} [{info.get('id')}] {info.get('duration_string') or ''}".rstrip())
+        for fmt in info.get('formats') or []:
+            size = fmt.get('filesize') or fmt.get('filesize_approx')
+            size = f"{size / (1024 * 1024):.1f} MB" if size else ''
+            print(f"  {fmt.get('format_id', ''):<12} {fmt.get('ext', ''):<5} {fmt.get('resolution') or '':<12} {size}".rstrip())
+    return status
+
+
+def cmd_import_archive(args):
+    # Carry over a yt_dlp --download-archive text file so those videos are skipped too
+    archive = DownloadArchive()
+    status = 0
+    for path in args.files:
+        try:
+            count = archive.import_text_archive(path)
+        except OSError as e:
+            log(f"❌ Error: Could not read '{path}': {e}")
+            status = 1
+            continue
+        log(f"Imported {count} archive entries from '{path}' into '{archive.path}'")
+    archive.close()
+    return status
+
+
+def cmd_daemon(args):
+    engine = build_engine(args)
+    engine.bandwidth.set_limit(args.limit_rate * 1024 * 1024)
+    settings = build_settings(args)
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        log("Stopping after the current batch...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    log(f"Daemon started: queue '{engine.queue.path}', saving to '{settings.download_folder}', {args.jobs} workers")
+    # The first pass also picks up jobs of a crashed run; rows another live process owns are left alone
+    rows = engine.queue.unfinished()
+    while not stop.is_set():
+        if rows:
+            done, failed = engine.run_jobs(rows, settings, args.jobs)
+            log(f"Batch finished: {done} done, {failed} failed")
+            log_timings(engine)
+        else:
+            stop.wait(args.poll)
+        if not stop.is_set():
+            rows = engine.queue.pending()
+    engine.metrics.close()
+    return 0
+
+
+def add_settings_arguments(parser):
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_WORKERS, help=f"parallel downloads (default {DEFAULT_WORKERS})")
+    parser.add_argument('-o', '--output', help="download folder (default: config.txt, else 'Video Downloaded')")
+    parser.add_argument('--cookies', help="cookies.txt for private Instagram/Facebook content")
+    parser.add_argument('--platform', choices=['auto', 'youtube', 'instagram', 'facebook'], default='auto')
+    parser.add_argument('--audio', action='store_true', help="download audio only")
+    parser.add_argument('--fragments', choices=FRAGMENT_CHOICES, default=DEFAULT_FRAGMENTS, help="HLS/DASH fragment parallelism")
+    parser.add_argument('--limit-rate', type=float, default=0, help="total bandwidth cap in MB/s shared by all downloads (default unlimited)")
+    parser.add_argument('--dedupe', action='store_true', help="replace identical files with hardlinks to one stored copy")
+    parser.add_argument('--rate-limits', default=RATE_LIMITS_FILE, help=f"per-host limits as JSON (default {RATE_LIMITS_FILE} if present)")
+    parser.add_argument('--events', metavar='FILE', help="append timed lifecycle events to FILE as JSON lines")
+    parser.add_argument('--metrics-port', type=int, default=0, help="serve phase timings for Prometheus on this port (/metrics)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='frog', description="Frog Downloader without the GUI")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    download = subparsers.add_parser('download', help="download URLs and exit")
+    download.add_argument('inputs', nargs='+', help="URLs, files with one URL per line, or - for stdin")
+    download.add_argument('--channel', action='store_true', help="treat the URLs as channels/playlists")
+    add_settings_arguments(download)
+    download.set_defaults(func=cmd_download)
+
+    enqueue = subparsers.add_parser('enqueue', help="add URLs to the queue for a running daemon")
+    enqueue.add_argument('inputs', nargs='+', help="URLs, files with one URL per line, or - for stdin")
+    enqueue.add_argument('--channel', action='store_true', help="treat the URLs as channels/playlists")
+    enqueue.set_defaults(func=cmd_enqueue)
+
+    info = subparsers.add_parser('info', help="show title and formats without downloading")
+    info.add_argument('inputs', nargs='+', help="URLs, files with one URL per line, or - for stdin")
+    add_settings_arguments(info)
+    info.set_defaults(func=cmd_info)
+
+    import_archive = subparsers.add_parser('import-archive', help="merge yt_dlp --download-archive text files into archive.db")
+    import_archive.add_argument('files', nargs='+', help="archive files with one '<extractor> <id>' per line")
+    import_archive.set_defaults(func=cmd_import_archive)
+
+    daemon = subparsers.add_parser('daemon', help="keep downloading whatever is queued")
+    daemon.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS, help=f"seconds between queue checks (default {DEFAULT_POLL_SECONDS})")
+    add_settings_arguments(daemon)
+    daemon.set_defaults(func=cmd_daemon)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,545 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+
+from content_store import ContentStore
+from ffmpeg_caps import get_ffmpeg_capabilities
+from fragment_tuner import apply_fragment_opts, DEFAULT_FRAGMENTS
+from metrics import Metrics
+from postprocess import PostProcessStage, extract_audio, remux
+from rate_limiter import RateLimiter, BandwidthManager, MODE_WEIGHTS
+from resume_store import sha256_file
+from scheduler import PriorityScheduler, PRIORITIES
+from url_canon import canonicalize, dedupe_urls
+
+# GUI-free download engine shared by the Tk front ends and frog.py.
+# Nothing in here may import tkinter/customtkinter, and yt_dlp (hundreds of
+# extractor modules) is only imported on first use; see
+# benchmarks/import_time.py.
+
+DEFAULT_WORKERS = 4
+MAX_WORKERS = 16
+STREAM_AHEAD = 2  # Channel entries queued per worker beyond the ones downloading
+MAX_PLAYLIST_DEPTH = 3  # Channel -> tab -> playlist
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+REFERERS = {
+    'youtube': 'https://www.youtube.com/',
+    'instagram': 'https://www.instagram.com/',
+    'facebook': 'https://www.facebook.com/',
+}
+
+
+_yt_dlp = None
+_yt_dlp_lock = threading.Lock()
+
+
+def load_yt_dlp():
+    global _yt_dlp
+    with _yt_dlp_lock:
+        if _yt_dlp is None:
+            import yt_dlp
+            _yt_dlp = yt_dlp
+        return _yt_dlp
+
+
+def warm_up():
+    # Pay for the yt_dlp import and the ffmpeg probe off the UI thread,
+    # after the window is already on screen
+    get_ffmpeg_capabilities()
+    load_yt_dlp()
+
+
+def detect_platform(url, selected='auto'):
+    if selected != 'auto':
+        return selected
+    url_lower = url.lower()
+    if 'youtube.com' in url_lower or 'youtu.be' in url_lower:
+        return 'youtube'
+    elif 'instagram.com' in url_lower:
+        return 'instagram'
+    elif 'facebook.com' in url_lower:
+        return 'facebook'
+    return 'auto'
+
+
+def is_nested_playlist(entry):
+    if entry.get('_type') == 'playlist':
+        return True
+    ie_key = entry.get('ie_key') or ''
+    return ie_key.endswith(('Tab', 'Playlist', 'Channel'))
+
+
+def archive_key(entry):
+    # Same "<extractor> <id>" key yt_dlp records in its download archive
+    ie_key = entry.get('ie_key') or entry.get('extractor_key')
+    if ie_key and entry.get('id'):
+        return f"{ie_key.lower()} {entry['id']}"
+    return None
+
+
+def reset_retcode(ydl):
+    # YoutubeDL.download() returns _download_retcode, which trouble() sets to 1
+    # and nothing clears; a reused session would report one URL's failure for
+    # every URL after it
+    ydl._download_retcode = 0
+    return ydl
+
+
+class JobTag:
+    # Stamps the job a session is downloading into every progress report as
+    # d['job']. A session runs one job at a time, so this also holds for its
+    # fragment threads, and yt_dlp hands the same dict to each hook in turn,
+    # so this hook goes first. Per-job state is keyed by d['job'], the URL
+    # slot() admitted, never by the URL yt_dlp resolved it to (redirects,
+    # cached info).
+    def __init__(self, url=None):
+        self.url = url
+
+    def progress_hook(self, d):
+        d['job'] = self.url
+
+
+def clamp_workers(workers):
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        workers = DEFAULT_WORKERS
+    return max(1, min(workers, MAX_WORKERS))
+
+
+class DownloadSettings:
+    # Snapshot of the user's choices, taken once on the thread that owns the
+    # widgets (or from CLI arguments) and then handed to worker threads.
+    def __init__(self, download_folder, cookie_file='', platform='auto', dl_type='video', fragments=DEFAULT_FRAGMENTS,
+                 stream_playlists=True, dedupe_files=False):
+        self.download_folder = download_folder
+        self.cookie_file = cookie_file
+        self.platform = platform
+        self.dl_type = dl_type
+        self.fragments = fragments
+        self.stream_playlists = stream_playlists  # Pipeline channel enumeration into downloads
+        self.dedupe_files = dedupe_files  # Hardlink identical files through the folder's content store
+
+    def session_key(self, url, playlist):
+        # Within one settings snapshot, options only vary by platform and playlist mode
+        return (detect_platform(url, self.platform), playlist)
+
+
+class DownloadEngine:
+    def __init__(self, queue=None, archive=None, fragment_tuner=None, log=print, progress_hooks=(), rate_limiter=None,
+                 resume=None, metadata=None, metrics=None):
+        self.queue = queue
+        self.archive = archive
+        self.resume = resume
+        self.metadata = metadata
+        self.fragment_tuner = fragment_tuner
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.metrics = metrics if metrics is not None else Metrics()  # No sinks: events are dropped
+        self.bandwidth = BandwidthManager()
+        self.scheduler = PriorityScheduler(listeners=[self.rate_limiter, self.bandwidth])
+        self.log = log
+        self.progress_hooks = list(progress_hooks)
+        self.postprocess = PostProcessStage()
+        self.content_stores = {}  # download folder -> ContentStore
+        self.content_stores_lock = threading.Lock()
+
+    def prepare_batch(self, urls, mode):
+        # Canonical URLs with duplicates dropped before anything is queued;
+        # pasted lists also drop videos the archive already holds
+        if mode == "channel":
+            return [url.strip() for url in urls]
+        if mode == "single":
+            return [canonicalize(url)[0] for url in urls]
+        unique, duplicates, archived = dedupe_urls(urls, self.archive)
+        if duplicates or archived:
+            self.log(f"រំលង {duplicates} URL ស្ទួន និង {archived} វីឌីអូដែលបានទាញយករួច")
+        return unique
+
+    def build_opts(self, settings, url='', playlist=False, format_override=None, job_tag=None):
+        os.makedirs(settings.download_folder, exist_ok=True)
+        ffmpeg = get_ffmpeg_capabilities()
+        platform = detect_platform(url, settings.platform)
+
+        opts = {
+            'outtmpl': os.path.join(settings.download_folder, '%(title)s.%(ext)s'),
+            'progress_hooks': ([job_tag.progress_hook] if job_tag is not None else []) + list(self.progress_hooks) +
+                              [self.scheduler.progress_hook, self.rate_limiter.progress_hook, self.bandwidth.progress_hook,
+                               self.metrics.progress_hook],
+            'quiet': False,
+            'no_warnings': False,
+            'ignoreerrors': True,  # Ignore errors to continue downloading
+            'retries': 10,  # Retry on network errors
+            'fragment_retries': 10,  # Retry on fragment download errors
+            'extractor_retries': 10,  # Retry on extractor errors
+            'noplaylist': not playlist,
+            'http_headers': {
+                'User-Agent': USER_AGENT,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'DNT': '1',
+                'Connection': 'keep-alive',
+            }
+        }
+        if platform in REFERERS:
+            opts['referer'] = REFERERS[platform]
+
+        # Audio extraction and remuxing happen in the post-processing stage (finalize_file)
+        if settings.dl_type == 'audio':
+            opts['format'] = 'bestaudio/best'
+            if not ffmpeg.available:
+                self.log("⚠️ Warning: ffmpeg not found. Audio will be downloaded as is.")
+        else:
+            opts['format'] = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best' if ffmpeg.can_merge_mp4 else 'best[ext=mp4]'
+            if ffmpeg.can_merge_mp4:
+                opts['merge_output_format'] = 'mp4'
+
+        apply_fragment_opts(opts, settings.fragments, self.fragment_tuner)
+
+        if self.resume is not None:
+            # Keep .part files and continue them with Range requests
+            opts['continuedl'] = True
+            opts['progress_hooks'].append(self.resume.progress_hook)
+        opts['post_hooks'] = [partial(self.finalize_file, settings)]
+        if format_override:
+            # The exact format of an interrupted download, so its .part file matches
+            opts['format'] = format_override
+
+        if self.archive is not None:
+            # Channel/playlist runs skip entries fetched before; explicit URLs only record
+            opts['download_archive'] = self.archive if playlist else self.archive.recorder()
+
+        if settings.cookie_file and os.path.exists(settings.cookie_file):
+            opts['cookiefile'] = settings.cookie_file
+            self.log(f"Using cookies from: {settings.cookie_file}")
+        return opts
+
+    def content_store(self, download_folder):
+        with self.content_stores_lock:
+            store = self.content_stores.get(download_folder)
+            if store is None:
+                store = self.content_stores[download_folder] = ContentStore(download_folder)
+            return store
+
+    def finalize_file(self, settings, filepath):
+        # yt_dlp post hook, once per downloaded (and merged) file. The rest
+        # runs in the post-processing pool so this download thread is free.
+        if os.path.exists(filepath):
+            self.postprocess.submit(self.postprocess_file, settings, filepath)
+
+    def postprocess_file(self, settings, filepath):
+        if self.resume is not None:
+            self.resume.check_existing(filepath)
+        ffmpeg = get_ffmpeg_capabilities()
+        source = filepath  # Metrics key for this file through to finalize
+        self.metrics.emit('postprocess_start', file=source)
+        try:
+            if settings.dl_type == 'audio' and ffmpeg.available:
+                filepath, saved = extract_audio(filepath, ffmpeg.path, ffmpeg.audio_codec(), ffmpeg.ffprobe)
+                self.postprocess.record_saved(saved)
+            elif settings.dl_type != 'audio' and ffmpeg.can_merge_mp4:
+                filepath, saved = remux(filepath, ffmpeg.path, ffmpeg.ffprobe)
+                self.postprocess.record_saved(saved)
+        except Exception as e:
+            self.metrics.emit('postprocess_end', file=source, error=str(e))
+            raise
+        self.metrics.emit('postprocess_end', file=source, output=filepath)
+        # Hash once for both the content store and the resume store's checksum
+        # record, which goes last so it sees the file as it stays on disk
+        digest = sha256_file(filepath)
+        if settings.dedupe_files:
+            saved = self.content_store(settings.download_folder).ingest(filepath, digest)
+            if saved:
+                self.log(f"✅ ឯកសារស្ទួន ត្រូវបានភ្ជាប់ សន្សំ {saved / (1024 * 1024):.1f} MB: {os.path.basename(filepath)}")
+        if self.resume is not None:
+            self.resume.post_hook(filepath, digest)
+        self.metrics.emit('finalize', file=source, output=filepath)
+
+    def create_session(self, settings, url='', playlist=False, format_override=None):
+        yt_dlp = load_yt_dlp()
+        job_tag = JobTag(url)
+        ydl = yt_dlp.YoutubeDL(self.build_opts(settings, url, playlist, format_override, job_tag))
+        ydl.job_tag = job_tag
+        if self.resume is not None and not playlist:
+            ydl.add_post_processor(self.resume.format_recorder(yt_dlp, job_tag), when='before_dl')
+        if self.fragment_tuner is not None:
+            self.fragment_tuner.attach(ydl)
+        return ydl
+
+    def _mark(self, state, job_id, error=None):
+        if self.queue is None:
+            return
+        if state == 'done':
+            self.queue.mark_done(job_id)
+        else:
+            self.queue.mark_failed(job_id, error)
+
+    def run_jobs(self, jobs, settings, workers=1, on_job_finished=None):
+        # jobs are (job_id, url, mode) with mode "single", "multiple" or "channel"
+        sessions = SessionCache(self, settings)
+
+        def download(url, mode):
+            if mode == "channel":
+                self.log(f"ចាប់ផ្តើមទាញយកឆានែល/បញ្ជីចាក់/ប្រវត្តិរូប/ទំព័រ: {url}")
+                if settings.stream_playlists:
+                    return self.stream_channel(url, settings, workers)
+            else:
+                self.log(f"កំពុងទាញយក: {url}")
+            self.bandwidth.set_weight(url, MODE_WEIGHTS.get(mode, 1))
+            try:
+                with self.scheduler.slot(url, PRIORITIES.get(mode, PRIORITIES['channel'])), self.rate_limiter.slot(url):
+                    return self.download_url(sessions, settings, url, mode == "channel")
+            finally:
+                self.bandwidth.clear_weight(url)
+
+        def worker(job_id, url, mode):
+            try:
+                retcode = download(url, mode)
+            finally:
+                # Taken even when the download raised, or its files would count towards this thread's next job
+                post = self.postprocess.take()
+            # ffmpeg carries on in the post-processing pool; this worker takes the next URL
+            return retcode, post
+
+        if self.queue is not None:
+            # Another process (the daemon, a second window) may have started a row since it was listed
+            jobs = [job for job in jobs if self.queue.claim(job[0])]
+        done = 0
+        workers = clamp_workers(workers)
+        io_saved = self.postprocess.io_saved
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frog-dl") as pool:
+                pending = {}
+                for job_id, url, mode in jobs:
+                    self.metrics.emit('enqueue', url, mode=mode)
+                    pending[pool.submit(worker, job_id, url, mode)] = (job_id, url)
+                while pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        job_id, url = pending.pop(future)
+                        try:
+                            result = future.result()
+                            if isinstance(result, tuple):
+                                retcode, post = result
+                                if retcode:
+                                    raise RuntimeError(f"yt_dlp exit code {retcode}")
+                                # Downloaded; the job is done once its files are post-processed
+                                pending[post] = (job_id, url)
+                                continue
+                        except Exception as e:
+                            self._mark('failed', job_id, e)
+                            self.log(f"❌ បរាជ័យ: {url}: {e}")
+                            ok = False
+                        else:
+                            done += 1
+                            self._mark('done', job_id)
+                            self.log(f"✅ ទាញយកបានសម្រេច: {url}")
+                            ok = True
+                        self.metrics.emit('job_end', url, ok=ok)
+                        if on_job_finished is not None:
+                            on_job_finished(job_id, url, ok)
+        finally:
+            sessions.close()
+        io_saved = self.postprocess.io_saved - io_saved
+        if io_saved:
+            self.log(f"រំលងការសរសេរឡើងវិញដែលមិនចាំបាច់: សន្សំ disk I/O {io_saved / (1024 * 1024):.1f} MB")
+        return done, len(jobs) - done
+
+    def download_url(self, sessions, settings, url, playlist):
+        self.metrics.emit('extract_start', url, playlist=playlist)
+        resume_format = self.resume.format_for(url) if self.resume is not None and not playlist else None
+        if resume_format is not None:
+            # A one-off session: the pinned format must not leak to other URLs
+            self.log(f"កំពុងបន្តពីកន្លែងដែលបានឈប់ (format {resume_format}): {url}")
+            ydl = self.create_session(settings, url, playlist, resume_format)
+            try:
+                retcode = ydl.download([url])
+            finally:
+                ydl.close()
+            self.resume.forget(url)
+            if not retcode:
+                return retcode
+            # The pinned format may no longer be offered; start over with normal format selection
+            self.log(f"⚠️ មិនអាចបន្ត format {resume_format} បានទេ កំពុងចាប់ផ្តើមឡើងវិញ: {url}")
+        if self.metadata is not None and not playlist:
+            retcode = self.download_via_cache(sessions.get(url, playlist), settings, url)
+        else:
+            retcode = sessions.get(url, playlist).download([url])
+        if not retcode and self.resume is not None:
+            self.resume.forget(url)
+        return retcode
+
+    def fetch_info(self, ydl, url):
+        # extract_info without downloading, answered from the metadata cache when possible
+        if self.metadata is not None:
+            info = self.metadata.load(url)
+            if info is not None:
+                return info
+        info = ydl.extract_info(url, download=False)
+        if info is not None and self.metadata is not None:
+            info = ydl.sanitize_info(info)
+            self.metadata.store(url, info)
+        return info
+
+    def get_info(self, settings, url):
+        # Title and format list for a preview, without downloading anything
+        ydl = load_yt_dlp().YoutubeDL(dict(self.build_opts(settings, url), quiet=True))
+        try:
+            return self.fetch_info(ydl, url)
+        finally:
+            ydl.close()
+
+    def download_via_cache(self, ydl, settings, url):
+        # Extract at most once: a miss stores the info and downloads from it,
+        # a hit skips the page, format and signature requests entirely
+        path = self.metadata.lookup(url)
+        cached = path is not None
+        if not cached:
+            info = ydl.extract_info(url, download=False)
+            if info is None:
+                return 1
+            path = self.metadata.store(url, ydl.sanitize_info(info))
+            if path is None:
+                return reset_retcode(ydl).download([url])
+        self.metrics.emit('extract_end', url, cached=cached)
+        # Judge the cached info by this call alone, not by anything the session reported before
+        retcode = reset_retcode(ydl).download_with_info_file(path)
+        if retcode and cached:
+            # Signed format URLs can die before their advertised expiry; extract afresh
+            self.metadata.invalidate(url)
+            self.log(f"⚠️ ព័ត៌មានក្នុង cache ហួសសុពលភាព កំពុងទាញយកម្តងទៀត: {url}")
+            fresh = self.create_session(settings, url)
+            try:
+                retcode = fresh.download([url])
+            finally:
+                fresh.close()
+        return retcode
+
+    def iter_playlist_entries(self, ydl, url, depth=0):
+        # process=False returns the extractor's raw result, whose entries are
+        # a generator that fetches the next page only when iterated
+        info = ydl.extract_info(url, download=False, process=False)
+        if not info:
+            # ignoreerrors turns an unreachable page into None; only a missing tab is tolerable
+            if depth == 0:
+                raise RuntimeError("could not read the channel/playlist page")
+            self.log(f"⚠️ មិនអាចអានបាន រំលង: {url}")
+            return
+        kind = info.get('_type', 'video')
+        if kind in ('url', 'url_transparent'):
+            if depth < MAX_PLAYLIST_DEPTH:
+                yield from self.iter_playlist_entries(ydl, info['url'], depth + 1)
+            return
+        if kind not in ('playlist', 'multi_video'):
+            yield {'url': info.get('webpage_url') or url, 'id': info.get('id'), 'ie_key': info.get('extractor_key')}
+            return
+        for entry in info.get('entries') or []:
+            if not entry:
+                continue
+            if is_nested_playlist(entry) and depth < MAX_PLAYLIST_DEPTH:
+                # e.g. a channel's Videos/Shorts/Live tabs
+                yield from self.iter_playlist_entries(ydl, entry.get('url') or entry.get('webpage_url'), depth + 1)
+            else:
+                yield entry
+
+    def stream_channel(self, url, settings, workers=1):
+        # Enumerate lazily on this thread and hand each entry to a download pool
+        # as soon as it appears, instead of resolving the whole channel before
+        # the first file starts. At most workers * (1 + STREAM_AHEAD) entries
+        # are in flight, so enumeration never races far ahead of downloading.
+        workers = clamp_workers(workers)
+        sessions = SessionCache(self, settings)
+        in_flight = threading.BoundedSemaphore(workers * (1 + STREAM_AHEAD))
+        counts = {'found': 0, 'skipped': 0, 'done': 0, 'failed': 0}
+        results = []  # (downloaded, post-processing future) per entry
+        results_lock = threading.Lock()
+
+        def report_entry(entry_url, ok, post):
+            error = post.exception()
+            if ok:
+                self.log(f"❌ បរាជ័យ: {entry_url}: {error}" if error else f"✅ ទាញយកបានសម្រេច: {entry_url}")
+            self.metrics.emit('job_end', entry_url, ok=ok and error is None)
+
+        def download_entry(entry_url):
+            try:
+                self.bandwidth.set_weight(entry_url, MODE_WEIGHTS['channel'])
+                with self.scheduler.slot(entry_url, PRIORITIES['channel']), self.rate_limiter.slot(entry_url):
+                    self.log(f"កំពុងទាញយក: {entry_url}")
+                    ok = not self.download_url(sessions, settings, entry_url, False)
+            except Exception as e:
+                self.log(f"❌ បរាជ័យ: {entry_url}: {e}")
+                ok = False
+            else:
+                if not ok:
+                    self.log(f"❌ បរាជ័យ: {entry_url}")
+            finally:
+                self.bandwidth.clear_weight(entry_url)
+                in_flight.release()
+                # Post-processing finishes in its own pool while this worker takes the next entry
+                post = self.postprocess.take()
+            post.add_done_callback(partial(report_entry, entry_url, ok))
+            with results_lock:
+                results.append((ok, post))
+
+        enumerator = load_yt_dlp().YoutubeDL(dict(self.build_opts(settings, url, playlist=True), quiet=True))
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frog-entry") as pool:
+                for entry in self.iter_playlist_entries(enumerator, url):
+                    entry_url = entry.get('url') or entry.get('webpage_url')
+                    if not entry_url:
+                        continue
+                    counts['found'] += 1
+                    key = archive_key(entry)
+                    if key and self.archive is not None and key in self.archive:
+                        counts['skipped'] += 1
+                        continue
+                    in_flight.acquire()
+                    self.metrics.emit('enqueue', entry_url, mode='channel')
+                    pool.submit(download_entry, entry_url)
+                if not counts['found'] and enumerator._download_retcode:
+                    # Every page the extractor tried failed, rather than an empty channel
+                    raise RuntimeError("could not list the channel/playlist entries")
+                self.log(f"ឆានែល: រកឃើញ {counts['found']} វីឌីអូ, រំលង {counts['skipped']} (បានទាញយករួច)")
+        finally:
+            enumerator.close()
+            sessions.close()
+        wait([post for ok, post in results])
+        for ok, post in results:
+            counts['done' if ok and post.exception() is None else 'failed'] += 1
+        self.log(f"ឆានែល: {counts['done']} បានសម្រេច, {counts['failed']} បរាជ័យ: {url}")
+        return 1 if counts['failed'] else 0
+
+
+class SessionCache:
+    # Each worker thread keeps its own YoutubeDL per option set (YoutubeDL is
+    # not thread-safe), so extractor setup, cookies and keep-alive
+    # connections carry over between that worker's URLs. get() is called
+    # once per URL and hands the session out with a clean retcode, tagged
+    # with that URL as its job.
+    def __init__(self, engine, settings):
+        self.engine = engine
+        self.settings = settings
+        self.local = threading.local()
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def get(self, url, playlist):
+        cache = getattr(self.local, 'sessions', None)
+        if cache is None:
+            cache = self.local.sessions = {}
+        key = self.settings.session_key(url, playlist)
+        ydl = cache.get(key)
+        if ydl is None:
+            ydl = cache[key] = self.engine.create_session(self.settings, url, playlist)
+            with self.lock:
+                self.sessions.append(ydl)
+        ydl.job_tag.url = url
+        return reset_retcode(ydl)
+
+    def close(self):
+        with self.lock:
+            sessions, self.sessions = self.sessions, []
+        for ydl in sessions:
+            ydl.close()
@@ -0,0 +1,71 @@
+import queue
+
+POLL_INTERVAL_MS = 100
+MAX_BATCH = 1000
+
+
+class GuiEventPump:
+    # Worker threads must never touch Tk widgets. They post (kind, payload)
+    # events here instead, and the Tk main loop drains the queue on a timer,
+    # handing each handler all payloads of its kind in one batch so a burst
+    # of log lines costs a single widget update. With a GuiProfiler every
+    # handler and queued call is timed on its own.
+    def __init__(self, root, handlers, interval_ms=POLL_INTERVAL_MS, max_batch=MAX_BATCH, profiler=None):
+        self.root = root
+        self.profiler = profiler
+        self.handlers = dict(handlers)
+        self.handlers.setdefault('call', self._run_calls)
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self.events = queue.SimpleQueue()
+        self.after_id = None
+
+    def post(self, kind, payload=None):
+        self.events.put((kind, payload))
+
+    def call(self, func, *args):
+        # Thread-safe replacement for root.after(0, func, *args)
+        self.events.put(('call', (func, args)))
+
+    def start(self):
+        if self.after_id is None:
+            self.after_id = self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _drain(self):
+        batches = {}
+        order = []
+        try:
+            for _ in range(self.max_batch):
+                kind, payload = self.events.get_nowait()
+                if kind not in batches:
+                    batches[kind] = []
+                    order.append(kind)
+                batches[kind].append(payload)
+        except queue.Empty:
+            pass
+        for kind in order:
+            handler = self.handlers.get(kind)
+            if handler is None:
+                continue
+            try:
+                if self.profiler is None:
+                    handler(batches[kind])
+                else:
+                    self.profiler.measure(f"event:{kind}", handler, batches[kind], detail=f" ({len(batches[kind])} events)")
+            except Exception as e:
+                print(f"Warning: GUI event handler '{kind}' failed: {e}")
+        # Come straight back if the queue is still backed up
+        delay = 1 if not self.events.empty() else self.interval_ms
+        self.after_id = self.root.after(delay, self._drain)
+
+    def _run_calls(self, calls):
+        for func, args in calls:
+            if self.profiler is None:
+                func(*args)
+            else:
+                self.profiler.call(func, *args)
@@ -0,0 +1,182 @@
+import cProfile
+import logging
+import logging.handlers
+import os
+import re
+import sys
+import threading
+import time
+import tkinter as tk
+
+PROFILE_LOG = "frog_profile.log"  # Lives next to config.txt
+PROFILE_DIR = "frog_profile"  # cProfile stats, one .prof file per thread
+SLOW_CALLBACK_MS = 16  # One frame at 60 Hz
+LAG_INTERVAL_MS = 100  # Heartbeat period for measuring main loop lag
+SUMMARY_ROWS = 40
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 1
+# From 3.12 cProfile sits on sys.monitoring, which allows one profiler per
+# process; there the CPU profile covers all threads in a single file
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+def get_profile_logger(log_file=PROFILE_LOG):
+    logger = logging.getLogger("frog.profile")
+    if not logger.handlers:
+        try:
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.abspath(log_file), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+        except OSError as e:
+            print(f"Warning: Could not open profile log file '{log_file}': {e}")
+            logger.addHandler(logging.NullHandler())
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def callback_name(func):
+    # after() registers a closure named callit; report the function it wraps
+    code = getattr(func, '__code__', None)
+    if code is not None and code.co_name == 'callit' and func.__closure__:
+        cells = dict(zip(code.co_freevars, func.__closure__))
+        if 'func' in cells:
+            func = cells['func'].cell_contents
+            code = getattr(func, '__code__', None)
+    func = getattr(func, '__func__', func)
+    name = getattr(func, '__qualname__', None) or type(func).__qualname__
+    if code is not None and code.co_name == '<lambda>':
+        name = f"{name}:{code.co_firstlineno}"
+    module = getattr(func, '__module__', None)
+    return f"{module}.{name}" if module and module != '__main__' else name
+
+
+class GuiProfiler:
+    # Diagnoses a frozen window. install() times every Python callback Tk
+    # runs (commands, bindings, after() timers) by wrapping
+    # tkinter.CallWrapper; GuiEventPump reports each handler and queued call
+    # separately through measure(). Callbacks slower than SLOW_CALLBACK_MS
+    # are logged by name as they happen, and a heartbeat on the Tk loop
+    # records how late it runs, which also catches workers starving the main
+    # thread of the GIL. With cpu=True every thread gets its own cProfile,
+    # written to PROFILE_DIR by stop() for `python -m pstats`.
+    def __init__(self, threshold_ms=SLOW_CALLBACK_MS, cpu=False, log_file=PROFILE_LOG, profile_dir=PROFILE_DIR):
+        self.threshold = threshold_ms / 1000
+        self.cpu = cpu
+        self.profile_dir = profile_dir
+        self.log = get_profile_logger(log_file)
+        self.stats = {}  # name -> [calls, total s, longest s, slow calls]; main thread only
+        self.profiles = {}  # "thread-ident" -> cProfile.Profile
+        self.profiles_lock = threading.Lock()
+        self.original_call = None
+        self.root = None
+        self.expected_tick = None
+
+    def install(self):
+        # Must run before the first widget: Tk keeps each CallWrapper's bound __call__ from registration time
+        profiler = self
+        original = self.original_call = tk.CallWrapper.__call__
+
+        def profiled_call(wrapper, *args):
+            name = getattr(wrapper, 'profile_name', None)
+            if name is None:
+                name = wrapper.profile_name = callback_name(wrapper.func)
+            start = time.perf_counter()
+            try:
+                return original(wrapper, *args)
+            finally:
+                profiler.record(name, time.perf_counter() - start)
+
+        tk.CallWrapper.__call__ = profiled_call
+        if self.cpu:
+            self.start_cpu_profiles()
+        self.log.info(f"Profiling started: slow callback threshold {self.threshold * 1000:.0f} ms, CPU profiles {'on' if self.cpu else 'off'}")
+        return self
+
+    def watch(self, root):
+        self.root = root
+        self.expected_tick = time.perf_counter() + LAG_INTERVAL_MS / 1000
+        root.after(LAG_INTERVAL_MS, self._tick)
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.record('main loop lag', max(0.0, now - self.expected_tick))
+        self.expected_tick = now + LAG_INTERVAL_MS / 1000
+        self.root.after(LAG_INTERVAL_MS, self._tick)
+
+    def record(self, name, seconds, detail=''):
+        entry = self.stats.get(name)
+        if entry is None:
+            entry = self.stats[name] = [0, 0.0, 0.0, 0]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        if seconds >= self.threshold:
+            entry[3] += 1
+            self.log.info(f"slow {seconds * 1000:8.1f} ms  {name}{detail}")
+
+    def measure(self, name, func, *args, detail=''):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.record(name, time.perf_counter() - start, detail)
+
+    def call(self, func, *args):
+        return self.measure(f"call:{callback_name(func)}", func, *args)
+
+    def start_cpu_profiles(self):
+        if PER_THREAD_PROFILES:
+            # Each new thread runs _profile_thread once, which swaps in its own cProfile
+            threading.setprofile(self._profile_thread)
+            self._enable_profile(threading.current_thread().name)
+        else:
+            self._enable_profile('all-threads')
+
+    def _profile_thread(self, frame, event, arg):
+        self._enable_profile(threading.current_thread().name)
+
+    def _enable_profile(self, name):
+        profile = cProfile.Profile()
+        with self.profiles_lock:
+            self.profiles[f"{name}-{threading.get_ident()}"] = profile
+        profile.enable()
+
+    def dump_cpu_profiles(self):
+        threading.setprofile(None)
+        with self.profiles_lock:
+            profiles, self.profiles = self.profiles, {}
+        if not profiles:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for name, profile in profiles.items():
+            path = os.path.join(self.profile_dir, re.sub(r'[^\w.-]', '_', name) + ".prof")
+            try:
+                profile.dump_stats(path)
+            except Exception as e:
+                self.log.info(f"Could not write CPU profile '{path}': {e}")
+        self.log.info(f"CPU profiles of {len(profiles)} threads written to '{os.path.abspath(self.profile_dir)}'")
+
+    def write_summary(self):
+        rows = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)[:SUMMARY_ROWS]
+        self.log.info(f"{'calls':>8} {'total ms':>10} {'max ms':>8} {'slow':>6}  callback")
+        for name, (calls, total, longest, slow) in rows:
+            self.log.info(f"{calls:>8} {total * 1000:>10.1f} {longest * 1000:>8.1f} {slow:>6}  {name}")
+
+    def stop(self):
+        if self.original_call is not None:
+            tk.CallWrapper.__call__ = self.original_call
+            self.original_call = None
+        if self.cpu:
+            self.dump_cpu_profiles()
+        self.write_summary()
+
+
+def profiler_from_env():
+    # FROG_PROFILE=1 logs slow Tk callbacks; FROG_PROFILE=cpu adds per-thread cProfile output
+    mode = os.environ.get('FROG_PROFILE', '').strip().lower()
+    if mode in ('', '0', 'off', 'no', 'false'):
+        return None
+    return GuiProfiler(cpu=mode == 'cpu').install()
@@ -0,0 +1,93 @@
+import tkinter as tk
+from tkinter import ttk
+
+from progress_tracker import aggregate, format_bytes, format_eta
+
+MAX_FINISHED_ROWS = 50  # Finished rows kept for reference; older ones are dropped
+COLUMNS = (
+    ('name', "ឯកសារ", 320),
+    ('progress', "%", 60),
+    ('size', "ទំហំ", 140),
+    ('speed', "ល្បឿន", 90),
+    ('eta', "ETA", 70),
+)
+
+
+class JobTable:
+    # Live table of the files being downloaded plus a summary line with the
+    # combined throughput and the ETA of those transfers; files still queued
+    # behind them are not counted. apply() takes a batch of JobProgress
+    # snapshots from the event pump, so each redraw touches only the rows
+    # that changed since the last drain.
+    def __init__(self, parent, font=None, height=6):
+        self.frame = tk.Frame(parent, bg=parent.cget('bg'))
+        self.summary_var = tk.StringVar(value="")
+        self.summary = tk.Label(self.frame, textvariable=self.summary_var, anchor='w', bg=parent.cget('bg'), font=font)
+        self.summary.pack(fill=tk.X)
+        self.tree = ttk.Treeview(self.frame, columns=[c[0] for c in COLUMNS], show='headings', height=height)
+        for column, heading, width in COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor='w' if column == 'name' else 'e', stretch=column == 'name')
+        scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.jobs = {}  # key -> latest JobProgress
+        self.finished = {}  # Keys of finished rows, oldest first; a dict keeps each key once
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_colors(self, bg, fg):
+        self.frame.config(bg=bg)
+        self.summary.config(bg=bg, fg=fg)
+
+    def apply(self, snapshots):
+        latest = {}
+        for job in snapshots:
+            latest[job.key] = job
+        for key, job in latest.items():
+            self.jobs[key] = job
+            fraction = job.fraction
+            size = format_bytes(job.downloaded)
+            if job.total:
+                size = f"{size} / {format_bytes(job.total)}"
+            values = (
+                ("✅ " if job.status == 'finished' else "❌ " if job.status == 'error' else "") + job.name,
+                f"{fraction * 100:.0f}%" if fraction is not None else "",
+                size,
+                f"{format_bytes(job.speed)}/s" if job.speed and job.status == 'downloading' else "",
+                format_eta(job.eta) if job.status == 'downloading' else "",
+            )
+            if self.tree.exists(key):
+                self.tree.item(key, values=values)
+            else:
+                self.tree.insert('', 0, iid=key, values=values)
+            if job.status != 'downloading':
+                self.finished[key] = None
+            else:
+                # Active again (a retry of the same file): not for eviction
+                self.finished.pop(key, None)
+        while len(self.finished) > MAX_FINISHED_ROWS:
+            key = next(iter(self.finished))
+            del self.finished[key]
+            self.jobs.pop(key, None)
+            if self.tree.exists(key):
+                self.tree.delete(key)
+        self.update_summary()
+
+    def update_summary(self):
+        active, speed, eta = aggregate(self.jobs.values())
+        if not active:
+            self.summary_var.set("")
+            return
+        text = f"កំពុងទាញយក {active} ឯកសារ · {format_bytes(speed)}/s"
+        if eta is not None:
+            text += f" · ETA ឯកសារកំពុងទាញ {format_eta(eta)}"
+        self.summary_var.set(text)
+
+    def clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self.jobs.clear()
+        self.finished.clear()
+        self.summary_var.set("")
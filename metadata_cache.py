@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+CACHE_DIR = "metadata_cache"  # Lives next to config.txt
+DEFAULT_TTL = 3 * 60 * 60  # Seconds an extract_info result is trusted
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+EXPIRY_MARGIN = 10 * 60  # Treat format URLs expiring this soon as expired
+
+
+def info_key(info):
+    # Canonical id, the same "<extractor> <id>" key as the download archive
+    extractor = info.get('extractor_key') or info.get('ie_key') or info.get('extractor')
+    if extractor and info.get('id'):
+        return f"{extractor.lower()} {info['id']}"
+    return None
+
+
+def formats_expire_at(info):
+    # Signed googlevideo URLs carry ?expire=<unix time>; the earliest one bounds the entry
+    expiry = None
+    for fmt in info.get('formats') or info.get('requested_formats') or []:
+        values = parse_qs(urlparse(fmt.get('url') or '').query).get('expire')
+        if values and values[0].isdigit():
+            expire = int(values[0])
+            expiry = expire if expiry is None else min(expiry, expire)
+    return expiry
+
+
+class MetadataCache:
+    # extract_info results stored as yt_dlp .info.json files, indexed in
+    # SQLite by canonical id and by every URL that resolved to it. Entries
+    # expire after a TTL or when their signed format URLs do, and the least
+    # recently used ones are evicted beyond max_entries/max_bytes. The files
+    # are what yt_dlp's download_with_info_file() expects, and that call
+    # re-extracts by itself if a format URL turns out to be dead.
+    def __init__(self, directory=CACHE_DIR, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.directory, "index.db"), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " path TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " expires REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, key TEXT NOT NULL)")
+
+    def _path_for(self, key):
+        safe = "".join(c if c.isalnum() or c in '-_' else '_' for c in key)
+        return os.path.join(self.directory, f"{safe}.info.json")
+
+    def lookup(self, url):
+        # Path of a fresh .info.json for url, or None
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT e.key, e.path, e.expires FROM urls u JOIN entries e ON e.key = u.key WHERE u.url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            key, path, expires = row
+            if expires <= now or not os.path.exists(path):
+                self._delete(key)
+                return None
+            self.conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return path
+
+    def load(self, url):
+        path = self.lookup(url)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url, info):
+        # info must already be JSON-safe (YoutubeDL.sanitize_info); returns the file path or None
+        key = info_key(info)
+        if key is None or info.get('_type', 'video') in ('url', 'url_transparent'):
+            return None
+        now = time.time()
+        expires = now + self.ttl
+        format_expiry = formats_expire_at(info)
+        if format_expiry is not None:
+            expires = min(expires, format_expiry - EXPIRY_MARGIN)
+        if expires <= now:
+            return None
+        path = self._path_for(key)
+        data = json.dumps(info, ensure_ascii=False)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, path, size, created, expires, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, path, os.path.getsize(path), now, expires, now),
+            )
+            for alias in {url, info.get('webpage_url'), info.get('original_url')}:
+                if alias:
+                    self.conn.execute("INSERT OR REPLACE INTO urls (url, key) VALUES (?, ?)", (alias, key))
+            self.conn.execute("COMMIT")
+            self._evict()
+        return path
+
+    def invalidate(self, url):
+        with self.lock:
+            row = self.conn.execute("SELECT key FROM urls WHERE url = ?", (url,)).fetchone()
+            if row is not None:
+                self._delete(row[0])
+
+    def _delete(self, key):
+        row = self.conn.execute("SELECT path FROM entries WHERE key = ?", (key,)).fetchone()
+        self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self.conn.execute("DELETE FROM urls WHERE key = ?", (key,))
+        if row is not None:
+            try:
+                os.remove(row[0])
+            except OSError:
+                pass
+
+    def _evict(self):
+        count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._delete(key)
+            count -= 1
+            total -= size
@@ -0,0 +1,286 @@
+import json
+import os
+import threading
+import time
+
+EVENTS_FILE = "frog_events.jsonl"  # Lives next to config.txt
+MAX_OPEN = 10000  # Unmatched phase starts kept by HistogramSink; oldest dropped first
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)  # Seconds
+
+# Lifecycle events, in order, for one URL ("job") and the files it produces:
+#
+#   enqueue            job handed to a download pool
+#   extract_start      worker starts on the job (page, formats, signatures)
+#   extract_end        info resolved, download about to start
+#   first_byte         first media bytes of a file arrived
+#   transfer_end       a file finished downloading
+#   postprocess_start  ffmpeg stage picked the file up
+#   postprocess_end    remux / audio extraction done
+#   finalize           hashed, recorded and deduplicated
+#   job_end            job done or failed (ok=True/False)
+#
+# A phase is the time between two events with the same key.
+PHASES = (
+    # (phase, start event, end event, key field)
+    ('queue', 'enqueue', 'extract_start', 'job'),
+    ('extract', 'extract_start', 'extract_end', 'job'),
+    ('connect', 'extract_end', 'first_byte', 'job'),
+    ('transfer', 'first_byte', 'transfer_end', 'file'),
+    ('postprocess', 'postprocess_start', 'postprocess_end', 'file'),
+    ('finalize', 'postprocess_end', 'finalize', 'file'),
+)
+
+
+class Metrics:
+    # Structured lifecycle events for the engine. emit() stamps an event with
+    # wall and monotonic time and hands it to every sink; with no sinks it
+    # returns at once, so the engine always calls it. progress_hook derives
+    # extract_end / first_byte / transfer_end from yt_dlp's progress events,
+    # keyed by the URL the job was started with (the hook's d['job']).
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.lock = threading.Lock()
+        self.extracted = set()  # Jobs whose extract_end was emitted
+        self.receiving = {}  # filename -> job, for files past their first byte
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def emit(self, event, job=None, **fields):
+        if not self.sinks:
+            return
+        record = {'event': event, 'ts': time.time(), 'mono': time.monotonic(), 'thread': threading.current_thread().name}
+        if job is not None:
+            record['job'] = job
+        record.update(fields)
+        if event == 'extract_end' and job is not None:
+            with self.lock:
+                self.extracted.add(job)
+        elif event == 'job_end':
+            with self.lock:
+                self.extracted.discard(job)
+                for filename in [f for f, owner in self.receiving.items() if owner == job]:
+                    del self.receiving[filename]
+        for sink in self.sinks:
+            try:
+                sink.handle(record)
+            except Exception as e:
+                print(f"Warning: Metrics sink {type(sink).__name__} failed: {e}")
+
+    def progress_hook(self, d):
+        if not self.sinks:
+            return
+        job = d.get('job')
+        filename = d.get('filename') or d.get('tmpfilename')
+        if not job or not filename:
+            return
+        events = []
+        with self.lock:
+            if job not in self.extracted:
+                self.extracted.add(job)
+                events.append(('extract_end', {}))
+            if d['status'] == 'downloading' and d.get('downloaded_bytes') and filename not in self.receiving:
+                self.receiving[filename] = job
+                events.append(('first_byte', {'file': filename}))
+            elif d['status'] == 'finished':
+                self.receiving.pop(filename, None)
+                events.append(('transfer_end', {'file': filename, 'bytes': d.get('downloaded_bytes') or d.get('total_bytes')}))
+        for event, fields in events:
+            self.emit(event, job, **fields)
+
+    def summary(self):
+        # Phase timings from the first sink that keeps them, else {}
+        for sink in self.sinks:
+            if hasattr(sink, 'summary'):
+                return sink.summary()
+        return {}
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class JsonLinesSink:
+    # One JSON object per line, appended, for offline analysis of long runs
+    def __init__(self, path=EVENTS_FILE):
+        self.path = os.path.abspath(path)
+        self.lock = threading.Lock()
+        self.file = open(self.path, 'a', encoding='utf-8', buffering=1)
+
+    def handle(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th observation
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for index, count in enumerate(self.counts):
+            upper = self.buckets[index] if index < len(self.buckets) else lower
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+
+class HistogramSink:
+    # In-process phase timings: pairs each phase's start and end events by
+    # key and records the duration, plus a counter per event name
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.histograms = {}  # phase -> Histogram
+        self.events = {}  # event -> count
+        self.open = {}  # (phase, key) -> start mono
+        self.starts = {}
+        self.ends = {}
+        for phase, start, end, key in PHASES:
+            self.starts.setdefault(start, []).append((phase, key))
+            self.ends.setdefault(end, []).append((phase, key))
+
+    def handle(self, record):
+        event = record['event']
+        with self.lock:
+            self.events[event] = self.events.get(event, 0) + 1
+            for phase, key in self.ends.get(event, ()):
+                started = self.open.pop((phase, record.get(key)), None)
+                if started is not None:
+                    histogram = self.histograms.get(phase)
+                    if histogram is None:
+                        histogram = self.histograms[phase] = Histogram(self.buckets)
+                    histogram.observe(record['mono'] - started)
+            for phase, key in self.starts.get(event, ()):
+                if record.get(key) is not None:
+                    self.open[(phase, record[key])] = record['mono']
+            while len(self.open) > MAX_OPEN:
+                del self.open[next(iter(self.open))]
+
+    def summary(self):
+        # {phase: (count, total seconds, p50, p95)} in lifecycle order
+        summary = {}
+        with self.lock:
+            for phase, start, end, key in PHASES:
+                h = self.histograms.get(phase)
+                if h is not None:
+                    summary[phase] = (h.count, h.sum, h.quantile(0.5), h.quantile(0.95))
+        return summary
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP frog_phase_seconds Time spent in each download lifecycle phase.",
+            "# TYPE frog_phase_seconds histogram",
+        ]
+        with self.lock:
+            for phase, h in self.histograms.items():
+                cumulative = 0
+                for index, count in enumerate(h.counts):
+                    cumulative += count
+                    le = f"{self.buckets[index]:g}" if index < len(self.buckets) else "+Inf"
+                    lines.append(f'frog_phase_seconds_bucket{{phase="{phase}",le="{le}"}} {cumulative}')
+                lines.append(f'frog_phase_seconds_sum{{phase="{phase}"}} {h.sum:.6f}')
+                lines.append(f'frog_phase_seconds_count{{phase="{phase}"}} {h.count}')
+            lines += ["# HELP frog_events_total Lifecycle events seen.", "# TYPE frog_events_total counter"]
+            lines += [f'frog_events_total{{event="{event}"}} {count}' for event, count in self.events.items()]
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        pass
+
+
+class PrometheusEndpoint:
+    # Serves a HistogramSink as Prometheus text on http://host:port/metrics.
+    # http.server is imported on start() so the engine's import stays cheap.
+    def __init__(self, histogram, port, host='127.0.0.1'):
+        self.histogram = histogram
+        self.port = port
+        self.host = host
+        self.server = None
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        histogram = self.histogram
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = histogram.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="frog-metrics", daemon=True).start()
+        return self
+
+    def handle(self, record):
+        pass
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def build_metrics(events_file=None, port=0):
+    # Histogram always; JSON lines and the Prometheus endpoint when asked for
+    histogram = HistogramSink()
+    metrics = Metrics([histogram])
+    if events_file:
+        try:
+            metrics.add_sink(JsonLinesSink(events_file))
+        except OSError as e:
+            print(f"Warning: Could not open events file '{events_file}': {e}")
+    if port:
+        try:
+            metrics.add_sink(PrometheusEndpoint(histogram, int(port)).start())
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not start metrics endpoint on port {port}: {e}")
+    return metrics
+
+
+def metrics_from_env():
+    # GUIs have no command line: FROG_EVENTS=file and FROG_METRICS_PORT=port opt in
+    return build_metrics(os.environ.get('FROG_EVENTS'), os.environ.get('FROG_METRICS_PORT'))
+
+
+def format_summary(summary):
+    # One line per phase for logs
+    lines = []
+    for phase, (count, total, p50, p95) in summary.items():
+        lines.append(f"{phase:<12} n={count:<6} total {total:9.1f}s  p50 {p50:7.2f}s  p95 {p95:7.2f}s")
+    return lines
@@ -0,0 +1,175 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_POST_WORKERS = os.cpu_count() or 2  # ffmpeg is CPU-bound: one process per core
+AUDIO_ENCODERS = {
+    'mp3': ['-c:a', 'libmp3lame', '-b:a', '192k'],
+    'm4a': ['-c:a', 'aac', '-b:a', '192k'],
+}
+AUDIO_CODEC_NAMES = {'mp3': 'mp3', 'm4a': 'aac'}  # ffprobe codec_name already in the target format
+# Audio the mp4 muxer takes as a stream copy; anything else (e.g. Vorbis) is re-encoded to AAC
+MP4_AUDIO_CODECS = {'aac', 'mp3', 'opus', 'alac', 'flac', 'ac3', 'eac3'}
+# ffprobe names one demuxer "mov,mp4,m4a,3gp,3g2,mj2"; the ftyp major brand tells an mp4 from
+# QuickTime or 3GP. Brands starting with "iso" (isom, iso2, iso6, ...) count as mp4 too.
+MP4_BRANDS = {'mp41', 'mp42', 'avc1', 'dash'}
+
+
+class PostProcessError(Exception):
+    pass
+
+
+def _subprocess_kwargs():
+    if sys.platform.startswith('win'):
+        return {'creationflags': subprocess.CREATE_NO_WINDOW}
+    return {}
+
+
+def run_ffmpeg(ffmpeg, *args):
+    result = subprocess.run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', *args], capture_output=True, text=True,
+                            encoding='utf-8', errors='replace', **_subprocess_kwargs())
+    if result.returncode:
+        lines = result.stderr.strip().splitlines()
+        raise PostProcessError(lines[-1] if lines else f"ffmpeg exit code {result.returncode}")
+
+
+def probe_media(path, ffprobe):
+    # (container names, [(codec_type, codec_name), ...], major brand or '') or None when ffprobe is unavailable or fails
+    if not ffprobe:
+        return None
+    try:
+        result = subprocess.run([ffprobe, '-v', 'error', '-show_entries',
+                                 'format=format_name:format_tags=major_brand:stream=codec_type,codec_name',
+                                 '-of', 'json', path], capture_output=True, text=True, encoding='utf-8', errors='replace',
+                                **_subprocess_kwargs())
+        data = json.loads(result.stdout)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+    container = data.get('format') or {}
+    formats = set(container.get('format_name', '').split(','))
+    streams = [(stream.get('codec_type'), stream.get('codec_name')) for stream in data.get('streams') or []]
+    brand = ((container.get('tags') or {}).get('major_brand') or '').strip().lower()
+    return formats, streams, brand
+
+
+def _convert(path, ext, ffmpeg, args):
+    # ffmpeg writes to a temp name next to the source, which is replaced only on success
+    base = os.path.splitext(path)[0]
+    target = f"{base}.{ext}"
+    tmp_path = f"{base}.temp.{ext}"
+    try:
+        run_ffmpeg(ffmpeg, '-i', path, *args, tmp_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, target)
+    if os.path.abspath(path) != os.path.abspath(target):
+        os.remove(path)
+    return target
+
+
+def remux(path, ffmpeg, ffprobe=None):
+    # mp4 output for a downloaded file. Returns (final path, bytes of disk I/O
+    # saved). Only a rewrite yt_dlp's FFmpegVideoRemuxer would have done counts
+    # as saved (reading and writing the whole file); it already skipped files
+    # whose extension matched, so those save nothing.
+    size = os.path.getsize(path)
+    is_mp4_name = path.lower().endswith('.mp4')
+    media = probe_media(path, ffprobe)
+    if media is None:
+        # No ffprobe: trust the extension, like yt_dlp's FFmpegVideoRemuxer
+        if is_mp4_name:
+            return path, 0
+        return _convert(path, 'mp4', ffmpeg, ['-map', '0', '-dn', '-ignore_unknown', '-c', 'copy', '-movflags', '+faststart']), 0
+    formats, streams, brand = media
+    if brand:
+        is_mp4 = 'mp4' in formats and (brand in MP4_BRANDS or brand.startswith('iso'))
+    else:
+        is_mp4 = 'mp4' in formats and is_mp4_name  # No ftyp brand reported: go by the extension
+    if is_mp4:
+        # Already an mp4 container (best[ext=mp4], or a merge into mp4); at most a rename
+        if is_mp4_name:
+            return path, 0
+        # e.g. an mp4 stream saved as .m4v or .mov: renamed where the remuxer would have rewritten it
+        target = f"{os.path.splitext(path)[0]}.mp4"
+        os.replace(path, target)
+        return target, 2 * size
+    args = ['-map', '0', '-dn', '-ignore_unknown', '-c', 'copy']
+    if any(kind == 'audio' and codec not in MP4_AUDIO_CODECS for kind, codec in streams):
+        args += ['-c:a', 'aac', '-b:a', '192k']
+    if any(kind == 'subtitle' for kind, codec in streams):
+        args += ['-c:s', 'mov_text']
+    return _convert(path, 'mp4', ffmpeg, args + ['-movflags', '+faststart']), 0
+
+
+def extract_audio(path, ffmpeg, codec, ffprobe=None):
+    # Same as yt_dlp's FFmpegExtractAudio with the original deleted afterwards,
+    # but an audio stream already in the target codec is copied, not re-encoded.
+    # Returns (final path, 0) like remux: every case it skips, it skipped before.
+    media = probe_media(path, ffprobe)
+    codecs = [name for kind, name in media[1] if kind == 'audio'] if media else []
+    already = codecs == [AUDIO_CODEC_NAMES[codec]]
+    if path.lower().endswith(f".{codec}") and (media is None or already):
+        return path, 0  # FFmpegExtractAudio skipped these too
+    if already:
+        return _convert(path, codec, ffmpeg, ['-vn', '-c:a', 'copy']), 0
+    return _convert(path, codec, ffmpeg, ['-vn', *AUDIO_ENCODERS[codec]]), 0
+
+
+def gather(futures):
+    # One future that completes when all of futures have, failing with the first error
+    combined = Future()
+    if not futures:
+        combined.set_result(None)
+        return combined
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(future):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            combined.set_exception(errors[0])
+        else:
+            combined.set_result(None)
+
+    for future in futures:
+        future.add_done_callback(on_done)
+    return combined
+
+
+class PostProcessStage:
+    # ffmpeg work (remux, audio extraction) and file finalization run here
+    # instead of inline in YoutubeDL.download(), so a download worker moves on
+    # to its next URL while ffmpeg is still busy with the previous file. Each
+    # task runs ffmpeg as its own process; the pool only bounds how many run
+    # at once. Tasks submitted from a thread are collected with take().
+    def __init__(self, workers=DEFAULT_POST_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frog-post")
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.io_saved = 0  # Bytes of disk reads and writes avoided by skipped rewrites
+
+    def record_saved(self, nbytes):
+        with self.lock:
+            self.io_saved += nbytes
+
+    def submit(self, func, *args):
+        future = self.pool.submit(func, *args)
+        if not hasattr(self.local, 'futures'):
+            self.local.futures = []
+        self.local.futures.append(future)
+        return future
+
+    def take(self):
+        # Everything the calling thread submitted since its last take(), as one future
+        futures = getattr(self.local, 'futures', [])
+        self.local.futures = []
+        return gather(futures)
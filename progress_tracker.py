@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+
+EMIT_INTERVAL = 0.2  # Seconds between snapshot batches
+SPEED_SMOOTHING = 0.3  # EWMA weight of the newest speed sample
+
+
+def format_bytes(n):
+    if n is None:
+        return ''
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return ''
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class JobProgress:
+    # Snapshot of one file being downloaded, safe to hand to the Tk thread
+    def __init__(self, key, name, status, downloaded=0, total=None, speed=None, eta=None):
+        self.key = key
+        self.name = name
+        self.status = status  # 'downloading', 'finished' or 'error'
+        self.downloaded = downloaded
+        self.total = total
+        self.speed = speed
+        self.eta = eta
+
+    @property
+    def fraction(self):
+        if self.status == 'finished':
+            return 1.0
+        if self.total:
+            return min(1.0, self.downloaded / self.total)
+        return None
+
+
+class _Transfer:
+    def __init__(self, name, downloaded):
+        self.name = name
+        self.status = 'downloading'
+        self.downloaded = downloaded
+        self.total = None
+        self.speed = None  # Smoothed bytes/s
+        self.sampled_bytes = downloaded
+        self.sampled_at = time.monotonic()
+
+
+class ProgressAggregator:
+    # yt_dlp progress hook plus a flusher. The hook runs on every chunk, so it
+    # only stores the newest numbers for its file under a lock; it never
+    # emits. Every EMIT_INTERVAL the flusher thread turns all files into
+    # JobProgress snapshots with speed measured from the byte deltas,
+    # smoothed with an EWMA, and the ETA derived from it, and hands them to
+    # emit() as one list (normally a single GuiEventPump event). UI cost is
+    # therefore fixed per tick, however fast chunks arrive.
+    def __init__(self, emit, interval=EMIT_INTERVAL):
+        self.emit = emit
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.transfers = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def progress_hook(self, d):
+        key = d.get('filename') or d.get('tmpfilename')
+        if not key:
+            return
+        downloaded = d.get('downloaded_bytes') or 0
+        with self.lock:
+            transfer = self.transfers.get(key)
+            if transfer is None:
+                transfer = self.transfers[key] = _Transfer(os.path.basename(key), downloaded)
+            transfer.status = d['status']
+            transfer.downloaded = downloaded
+            transfer.total = d.get('total_bytes') or d.get('total_bytes_estimate') or transfer.total
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="frog-progress", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        now = time.monotonic()
+        snapshots = []
+        with self.lock:
+            for key, transfer in list(self.transfers.items()):
+                elapsed = now - transfer.sampled_at
+                if transfer.status == 'downloading' and elapsed > 0:
+                    sample = max(0, transfer.downloaded - transfer.sampled_bytes) / elapsed
+                    transfer.speed = sample if transfer.speed is None else SPEED_SMOOTHING * sample + (1 - SPEED_SMOOTHING) * transfer.speed
+                    transfer.sampled_bytes = transfer.downloaded
+                    transfer.sampled_at = now
+                eta = None
+                if transfer.total and transfer.speed:
+                    eta = max(0, transfer.total - transfer.downloaded) / transfer.speed
+                snapshots.append(JobProgress(key, transfer.name, transfer.status, transfer.downloaded, transfer.total,
+                                             transfer.speed, eta))
+                if transfer.status != 'downloading':
+                    del self.transfers[key]
+        if snapshots:
+            self.emit(snapshots)
+
+
+def aggregate(jobs):
+    # (active count, combined bytes/s, ETA in seconds or None) over the latest snapshot per job.
+    # The ETA covers the active transfers only; nothing is known yet about queued ones.
+    active = [job for job in jobs if job.status == 'downloading']
+    speed = sum(job.speed or 0 for job in active)
+    remaining = sum(job.total - job.downloaded for job in active if job.total)
+    eta = remaining / speed if speed and remaining else None
+    return len(active), speed, eta
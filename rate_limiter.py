@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+RATE_LIMITS_FILE = "rate_limits.json"  # Optional overrides, next to config.txt
+
+
+class TokenBucket:
+    # Reservation-style bucket: a caller takes its tokens immediately (the
+    # balance may go negative) and sleeps until the debt would have refilled,
+    # so waiters are served roughly in arrival order. rate <= 0 means no limit.
+    def __init__(self, rate, burst=None):
+        self.lock = threading.Lock()
+        self.rate = 0
+        self.burst = 0
+        self.tokens = 0
+        self.updated = time.monotonic()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        with self.lock:
+            self._refill()
+            self.rate = float(rate or 0)
+            self.burst = float(burst if burst is not None else max(self.rate, 1))
+            self.tokens = min(self.tokens, self.burst) if self.tokens else self.burst
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens=1):
+        # Returns how long the caller must wait before using the tokens
+        with self.lock:
+            if self.rate <= 0:
+                return 0
+            self._refill()
+            self.tokens -= tokens
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def acquire(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class HostPolicy:
+    def __init__(self, requests_per_second=0, max_connections=0, bytes_per_second=0):
+        self.requests_per_second = requests_per_second  # Download starts per second, 0 = unlimited
+        self.max_connections = max_connections  # Simultaneous downloads, 0 = unlimited
+        self.bytes_per_second = bytes_per_second  # Shared transfer rate, 0 = unlimited
+
+    def to_dict(self):
+        return {
+            'requests_per_second': self.requests_per_second,
+            'max_connections': self.max_connections,
+            'bytes_per_second': self.bytes_per_second,
+        }
+
+
+# Conservative defaults: Instagram answers bursts with 429s and temporary bans
+DEFAULT_POLICIES = {
+    'instagram': HostPolicy(requests_per_second=0.5, max_connections=2),
+    'facebook': HostPolicy(requests_per_second=1, max_connections=3),
+    'youtube': HostPolicy(requests_per_second=2, max_connections=6),
+    'default': HostPolicy(requests_per_second=2, max_connections=8),
+}
+
+
+def limiter_key(url):
+    # Known platforms share one budget across their hosts; anything else is keyed by host
+    host = (urlparse(url).hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    for platform, domains in (('youtube', ('youtube.com', 'youtu.be')),
+                              ('instagram', ('instagram.com',)),
+                              ('facebook', ('facebook.com', 'fb.watch'))):
+        if any(host == domain or host.endswith('.' + domain) for domain in domains):
+            return platform
+    return host or 'default'
+
+
+def load_policies(path=RATE_LIMITS_FILE):
+    # {"instagram": {"requests_per_second": 0.2, "max_connections": 1, "bytes_per_second": 2000000}, ...}
+    policies = {key: HostPolicy(**policy.to_dict()) for key, policy in DEFAULT_POLICIES.items()}
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                overrides = json.load(f)
+            for key, values in overrides.items():
+                base = policies.get(key, policies['default']).to_dict()
+                base.update(values)
+                policies[key] = HostPolicy(**base)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Warning: Could not load rate limits from '{path}': {e}")
+    return policies
+
+
+class _HostState:
+    def __init__(self, policy):
+        self.requests = TokenBucket(policy.requests_per_second)
+        self.connections = threading.BoundedSemaphore(policy.max_connections) if policy.max_connections > 0 else None
+        self.bytes = TokenBucket(policy.bytes_per_second, burst=max(policy.bytes_per_second, 256 * 1024))
+
+
+class RateLimiter:
+    # Shared by every download worker. slot() gates the start of a download
+    # on the host's request rate and connection budget; progress_hook charges
+    # transferred bytes to the host's byte bucket, sleeping inside yt_dlp's
+    # download loop when the host is over its rate.
+    def __init__(self, policies=None):
+        self.policies = policies if policies is not None else load_policies()
+        self.hosts = {}
+        self.lock = threading.Lock()
+        self.held = {}  # Admitted job URL -> host state whose connection it holds
+        self.transferred = {}
+        self.transferred_lock = threading.Lock()
+
+    def _state(self, key):
+        with self.lock:
+            state = self.hosts.get(key)
+            if state is None:
+                policy = self.policies.get(key) or self.policies.get('default') or HostPolicy()
+                state = self.hosts[key] = _HostState(policy)
+            return state
+
+    @contextmanager
+    def slot(self, url):
+        state = self._state(limiter_key(url))
+        if state.connections is not None:
+            state.connections.acquire()
+        with self.lock:
+            self.held[url] = state
+        try:
+            state.requests.acquire()
+            yield
+        finally:
+            with self.lock:
+                self.held.pop(url, None)
+            if state.connections is not None:
+                state.connections.release()
+
+    def pause(self, url, d=None):
+        # PriorityScheduler listener: a paused transfer hands the connection
+        # its job's slot() took to the download it yields to. Keyed by the
+        # admitted job, whose host may differ from the URL yt_dlp resolved.
+        with self.lock:
+            state = self.held.get(url)
+        if state is not None and state.connections is not None:
+            state.connections.release()
+
+    def resume(self, url, d=None):
+        with self.lock:
+            state = self.held.get(url)
+        if state is not None and state.connections is not None:
+            state.connections.acquire()
+
+    def progress_hook(self, d):
+        info = d.get('info_dict') or {}
+        url = info.get('webpage_url') or info.get('url') or ''
+        name = d.get('filename') or d.get('tmpfilename')
+        downloaded = d.get('downloaded_bytes') or 0
+        with self.transferred_lock:
+            if d['status'] != 'downloading':
+                self.transferred.pop(name, None)
+                return
+            # The first report seeds the baseline: a resumed .part file starts at its offset, not 0
+            delta = downloaded - self.transferred.get(name, downloaded)
+            self.transferred[name] = downloaded
+        if delta > 0:
+            self._state(limiter_key(url)).bytes.acquire(delta)
+
+
+# Relative bandwidth weights: an interactive single URL is not starved by a channel mirror
+MODE_WEIGHTS = {'single': 4, 'multiple': 2, 'channel': 1}
+BANDWIDTH_CHOICES = ['0', '1', '2', '5', '10', '20', '50', '100']  # MB/s, 0 = unlimited
+
+
+class BandwidthManager:
+    # Global bandwidth ceiling split between the transfers that are active
+    # right now, in proportion to their weights. Each transfer gets its own
+    # bucket and the rates are rebalanced whenever one starts or finishes or
+    # the ceiling changes, so set_limit() takes effect on running downloads.
+    # A transfer paused by the PriorityScheduler leaves the split until its
+    # next progress report.
+    def __init__(self, limit=0):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.weights = {}  # Job URL (the hook's d['job']) -> weight
+        self.active = {}  # file being transferred -> [weight, bucket, bytes so far]
+
+    def set_limit(self, bytes_per_second):
+        with self.lock:
+            self.limit = max(0, int(bytes_per_second or 0))
+            self._rebalance()
+
+    def set_weight(self, url, weight):
+        with self.lock:
+            self.weights[url] = weight
+
+    def clear_weight(self, url):
+        with self.lock:
+            self.weights.pop(url, None)
+
+    def _rebalance(self):
+        total = sum(weight for weight, bucket, transferred in self.active.values())
+        for weight, bucket, transferred in self.active.values():
+            rate = self.limit * weight / total if self.limit and total else 0
+            bucket.set_rate(rate, burst=max(rate / 4, 64 * 1024))
+
+    def pause(self, url, d=None):
+        name = (d or {}).get('filename') or (d or {}).get('tmpfilename')
+        with self.lock:
+            if self.active.pop(name, None) is not None:
+                self._rebalance()
+
+    def resume(self, url, d=None):
+        pass  # Re-registered, with a fresh baseline, by its next progress_hook call
+
+    def progress_hook(self, d):
+        name = d.get('filename') or d.get('tmpfilename')
+        with self.lock:
+            if d['status'] != 'downloading':
+                if self.active.pop(name, None) is not None:
+                    self._rebalance()
+                return
+            downloaded = d.get('downloaded_bytes') or 0
+            job = self.active.get(name)
+            if job is None:
+                weight = self.weights.get(d.get('job')) or 1
+                # Baseline is the first report, so a resumed .part file is not charged its offset
+                job = self.active[name] = [weight, TokenBucket(0), downloaded]
+                self._rebalance()
+            delta = downloaded - job[2]
+            job[2] = downloaded
+            bucket = job[1]
+        if delta > 0:
+            bucket.acquire(delta)
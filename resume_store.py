@@ -0,0 +1,192 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+RESUME_FILE = "partials.db"  # Lives next to config.txt
+SAVE_INTERVAL = 2.0  # Seconds between offset updates for one file
+HASH_CHUNK = 1024 * 1024
+
+
+class SizeMismatchError(Exception):
+    pass
+
+
+class ChecksumMismatchError(Exception):
+    pass
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResumeStore:
+    # Remembers every partially downloaded file with its source URL and the
+    # byte offset reached, and the full format yt_dlp selected for the URL
+    # ("137+140" for a merged video+audio download) as the download starts.
+    # After a restart the engine asks for the same format again, so yt_dlp
+    # finds the .part files and continues them with HTTP Range requests
+    # instead of starting over.
+    # Finished files are checked against the expected size and their SHA-256
+    # is recorded; a file yt_dlp later reports as already downloaded must
+    # still match it.
+    def __init__(self, path=RESUME_FILE):
+        self.path = os.path.abspath(path)
+        self.lock = threading.Lock()
+        self.last_saved = {}
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS partials ("
+            " tmpfilename TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " format_id TEXT,"
+            " downloaded_bytes INTEGER NOT NULL,"
+            " total_bytes INTEGER,"
+            " updated REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS partials_url ON partials (url)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS selected ("
+            " url TEXT PRIMARY KEY,"
+            " format_id TEXT NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS completed ("
+            " filepath TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " finished REAL NOT NULL,"
+            " mtime REAL)"
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(completed)")]
+        if 'mtime' not in columns:
+            self.conn.execute("ALTER TABLE completed ADD COLUMN mtime REAL")
+
+    def format_recorder(self, yt_dlp, job):
+        # A before_dl postprocessor: its info still holds the whole selection,
+        # while progress hooks of a merged download only see one part's format.
+        # job.url is the job the session is downloading.
+        store = self
+
+        class RecordFormat(yt_dlp.postprocessor.PostProcessor):
+            def run(self, info):
+                store.record_format(job.url, info)
+                return [], info
+
+        return RecordFormat()
+
+    def record_format(self, url, info):
+        requested = info.get('requested_formats') or ()
+        format_id = '+'.join(f['format_id'] for f in requested if f.get('format_id')) or info.get('format_id')
+        if not url or not format_id:
+            return
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO selected (url, format_id, updated) VALUES (?, ?, ?)",
+                (url, format_id, time.time()),
+            )
+
+    def format_for(self, url):
+        # The format selected when the unfinished download started, else the
+        # part format ids (rows written before the selection was recorded)
+        with self.lock:
+            if not self.conn.execute("SELECT 1 FROM partials WHERE url = ? LIMIT 1", (url,)).fetchone():
+                return None
+            row = self.conn.execute("SELECT format_id FROM selected WHERE url = ?", (url,)).fetchone()
+            if row is not None:
+                return row[0]
+            rows = self.conn.execute(
+                "SELECT format_id FROM partials WHERE url = ? AND format_id IS NOT NULL ORDER BY rowid", (url,)
+            ).fetchall()
+        format_ids = []
+        for format_id, in rows:
+            if format_id not in format_ids:
+                format_ids.append(format_id)
+        return '+'.join(format_ids) or None
+
+    def forget(self, url):
+        with self.lock:
+            self.conn.execute("DELETE FROM partials WHERE url = ?", (url,))
+            self.conn.execute("DELETE FROM selected WHERE url = ?", (url,))
+
+    def progress_hook(self, d):
+        info = d.get('info_dict') or {}
+        url = d.get('job')
+        tmpfilename = d.get('tmpfilename') or d.get('filename')
+        if not url or not tmpfilename:
+            return
+        if d['status'] == 'downloading':
+            now = time.monotonic()
+            if now - self.last_saved.get(tmpfilename, 0) < SAVE_INTERVAL:
+                return
+            self.last_saved[tmpfilename] = now
+            total = d.get('total_bytes')  # Exact sizes only: an estimate cannot fail a finished file
+            with self.lock:
+                self.conn.execute(
+                    "INSERT INTO partials (tmpfilename, url, format_id, downloaded_bytes, total_bytes, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (tmpfilename) DO UPDATE SET downloaded_bytes = excluded.downloaded_bytes,"
+                    " total_bytes = excluded.total_bytes, updated = excluded.updated",
+                    (tmpfilename, url, info.get('format_id'), d.get('downloaded_bytes') or 0, total, time.time()),
+                )
+        elif d['status'] == 'finished':
+            filename = d.get('filename')
+            # 'finished' has no tmpfilename, and its total_bytes is just the byte count
+            parts = (filename, f"{filename}.part")
+            for name in parts:
+                self.last_saved.pop(name, None)
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT total_bytes FROM partials WHERE tmpfilename IN (?, ?) AND total_bytes IS NOT NULL", parts
+                ).fetchone()
+            expected = row[0] if row else None
+            if filename and expected and os.path.exists(filename):
+                size = os.path.getsize(filename)
+                if size != expected:
+                    # Raising here makes yt_dlp report the download as failed, so it is retried
+                    os.remove(filename)
+                    self.forget(url)
+                    raise SizeMismatchError(f"{filename}: expected {expected} bytes, got {size}")
+
+    def post_hook(self, filepath, digest=None):
+        # yt_dlp calls this once per final file, after merging and post-processing
+        if not os.path.exists(filepath):
+            return
+        size = os.path.getsize(filepath)
+        digest = digest or sha256_file(filepath)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completed (filepath, size, sha256, finished, mtime) VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(filepath), size, digest, time.time(), os.path.getmtime(filepath)),
+            )
+
+    def verify(self, filepath):
+        # True/False against the recorded checksum, None if the file was never
+        # recorded or has been downloaded again since
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, sha256, mtime FROM completed WHERE filepath = ?", (os.path.abspath(filepath),)
+            ).fetchone()
+        if row is None or not os.path.exists(filepath):
+            return None
+        size, digest, mtime = row
+        if os.path.getmtime(filepath) != mtime:
+            return None
+        return os.path.getsize(filepath) == size and sha256_file(filepath) == digest
+
+    def check_existing(self, filepath):
+        # A file reused from an earlier run: drop it when it no longer matches,
+        # so the retry downloads it again
+        if self.verify(filepath) is False:
+            os.remove(filepath)
+            with self.lock:
+                self.conn.execute("DELETE FROM completed WHERE filepath = ?", (os.path.abspath(filepath),))
+            raise ChecksumMismatchError(f"{filepath}: content changed since it was downloaded")
@@ -0,0 +1,89 @@
+import threading
+from contextlib import contextmanager
+
+# Lower number wins: an interactive single URL > a pasted batch > a background channel sync
+PRIORITIES = {'single': 0, 'multiple': 1, 'channel': 2}
+LOWEST_PRIORITY = max(PRIORITIES.values())
+DEFAULT_SLOTS = 16  # Downloads running at once across every batch
+
+
+class PriorityScheduler:
+    # One instance per engine, shared by every batch the GUI or CLI starts.
+    #
+    # slot() admits a download when a slot is free and no higher-priority
+    # download is waiting. checkpoint() runs from the progress hook on every
+    # chunk: while higher-priority work is running or waiting, a
+    # lower-priority transfer gives its slot back and blocks right there,
+    # pausing the transfer, until the higher class has drained and a slot is
+    # free again. yt_dlp then simply carries on reading.
+    #
+    # A paused transfer must not keep anything the higher-priority work may
+    # be waiting for (e.g. a per-host connection), or both sides wait for
+    # each other. listeners get pause(url, d) when a transfer gives its slot
+    # back and resume(url, d) after it has its slot again, outside the lock.
+    # url is always the key slot() admitted (the hook's d['job']); a
+    # transfer that was not admitted is left alone.
+    def __init__(self, slots=DEFAULT_SLOTS, listeners=()):
+        self.slots = slots
+        self.listeners = list(listeners)
+        self.cond = threading.Condition()
+        self.running = dict.fromkeys(range(LOWEST_PRIORITY + 1), 0)
+        self.waiting = dict.fromkeys(range(LOWEST_PRIORITY + 1), 0)
+        self.priorities = {}  # Admitted job URL -> priority
+        self.released = set()  # Paused transfers that gave their slot back
+
+    def _free_slot(self):
+        return sum(self.running.values()) < self.slots
+
+    def _higher_pending(self, priority):
+        return any(self.running[p] or self.waiting[p] for p in range(priority))
+
+    @contextmanager
+    def slot(self, url, priority):
+        with self.cond:
+            self.priorities[url] = priority
+            self.waiting[priority] += 1
+            # Notify so that lower-priority transfers notice us and pause
+            self.cond.notify_all()
+            while not self._free_slot() or self._higher_pending(priority):
+                self.cond.wait()
+            self.waiting[priority] -= 1
+            self.running[priority] += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.running[priority] -= 1
+                self.priorities.pop(url, None)
+                self.cond.notify_all()
+
+    def checkpoint(self, url, priority=None, d=None):
+        with self.cond:
+            if priority is None:
+                priority = self.priorities.get(url)
+                if priority is None:
+                    return  # Never admitted: there is no slot to give back
+            if not self._higher_pending(priority):
+                return
+            # Fragment threads of one download share a key; only the first gives the slot back
+            if url not in self.released:
+                self.released.add(url)
+                self.running[priority] -= 1
+                for listener in self.listeners:
+                    listener.pause(url, d)
+                self.cond.notify_all()
+            while self._higher_pending(priority) or (url in self.released and not self._free_slot()):
+                self.cond.wait()
+            resumed = url in self.released
+            if resumed:
+                self.released.discard(url)
+                self.running[priority] += 1
+        if resumed:
+            # May block (e.g. on the host connection), so never under the condition lock
+            for listener in self.listeners:
+                listener.resume(url, d)
+
+    def progress_hook(self, d):
+        if d['status'] != 'downloading':
+            return
+        self.checkpoint(d.get('job'), d=d)
@@ -0,0 +1,51 @@
+import logging
+import logging.handlers
+import os
+import tkinter as tk
+
+LOG_FILE = "frog_downloader.log"  # Lives next to config.txt
+MAX_LINES = 500  # Lines kept in the status widget
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+
+def get_history_logger(log_file=LOG_FILE, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+    logger = logging.getLogger("frog.status")
+    if not logger.handlers:
+        try:
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.abspath(log_file), maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+        except OSError as e:
+            print(f"Warning: Could not open status log file '{log_file}': {e}")
+            logger.addHandler(logging.NullHandler())
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class StatusLog:
+    # Keeps only the newest max_lines lines in the Tk text widget so inserts
+    # stay cheap however long the session runs; the full history goes to a
+    # rotating log file instead.
+    def __init__(self, widget, max_lines=MAX_LINES, log_file=LOG_FILE):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.line_count = 0
+        self.history = get_history_logger(log_file)
+
+    def write(self, messages):
+        for message in messages:
+            self.history.info(message)
+        text = "".join(f"{message}\n" for message in messages)
+        self.widget.config(state='normal')
+        self.widget.insert(tk.END, text)
+        self.line_count += text.count("\n")
+        excess = self.line_count - self.max_lines
+        if excess > 0:
+            self.widget.delete("1.0", f"{excess + 1}.0")
+            self.line_count -= excess
+        self.widget.see(tk.END)
+        self.widget.config(state='disabled')
@@ -0,0 +1,85 @@
+import re
+from urllib.parse import urlparse, parse_qs
+
+# Offline URL canonicalization for the platforms the downloaders auto-detect.
+# canonicalize() maps every spelling of one video to a single URL plus the
+# "<extractor> <id>" key yt_dlp writes to the download archive, so a pasted
+# batch can be deduplicated (and checked against the archive) before any
+# extraction happens. URLs that cannot be resolved without a request, such as
+# fb.watch short links, come back unchanged with key None.
+
+YOUTUBE_ID = re.compile(r'^[0-9A-Za-z_-]{11}$')
+YOUTUBE_HOSTS = ('youtube.com', 'youtube-nocookie.com')
+YOUTUBE_PATH = re.compile(r'^/(?:shorts|embed|live|v|e)/([0-9A-Za-z_-]{11})(?:[/?#]|$)')
+INSTAGRAM_PATH = re.compile(r'^(?:/[^/]+)?/(?:p|tv|reels?)/([^/?#&]+)')
+FACEBOOK_PATH = re.compile(r'/(?:videos|reel|reels)/(?:[^/?#]+/)?(\d+)')
+
+
+def _host(parsed):
+    host = (parsed.hostname or '').lower()
+    for prefix in ('www.', 'm.', 'mobile.', 'music.', 'web.'):
+        if host.startswith(prefix):
+            return host[len(prefix):]
+    return host
+
+
+def _youtube_id(parsed, host):
+    if host == 'youtu.be':
+        video_id = parsed.path.strip('/').split('/')[0]
+        return video_id if YOUTUBE_ID.match(video_id) else None
+    if not any(host == domain or host.endswith('.' + domain) for domain in YOUTUBE_HOSTS):
+        return None
+    if parsed.path in ('/watch', '/watch/'):
+        video_id = (parse_qs(parsed.query).get('v') or [''])[0]
+        return video_id if YOUTUBE_ID.match(video_id) else None
+    match = YOUTUBE_PATH.match(parsed.path)
+    return match.group(1) if match else None
+
+
+def canonicalize(url):
+    # Returns (url, key); key is None when the URL is not a recognised single video
+    url = url.strip()
+    if '://' not in url and re.match(r'^(?:www\.|m\.)?(?:youtube\.com|youtu\.be|instagram\.com|facebook\.com)/', url, re.I):
+        url = 'https://' + url
+    parsed = urlparse(url)
+    host = _host(parsed)
+
+    video_id = _youtube_id(parsed, host)
+    if video_id:
+        return f"https://www.youtube.com/watch?v={video_id}", f"youtube {video_id}"
+
+    if host == 'instagram.com':
+        match = INSTAGRAM_PATH.match(parsed.path)
+        if match:
+            shortcode = match.group(1)
+            return f"https://www.instagram.com/p/{shortcode}/", f"instagram {shortcode}"
+
+    if host == 'facebook.com':
+        match = FACEBOOK_PATH.search(parsed.path)
+        video_id = match.group(1) if match else None
+        if video_id is None and parsed.path.rstrip('/') == '/watch':
+            video_id = (parse_qs(parsed.query).get('v') or [''])[0]
+        if video_id and video_id.isdigit():
+            return f"https://www.facebook.com/watch/?v={video_id}", f"facebook {video_id}"
+
+    return url, None
+
+
+def dedupe_urls(urls, archive=None):
+    # Canonical URLs in first-seen order, plus how many were duplicates and
+    # how many the archive already holds. Unrecognised URLs are compared as-is.
+    seen = set()
+    unique = []
+    duplicates = archived = 0
+    for url in urls:
+        url, key = canonicalize(url)
+        identity = key or url
+        if identity in seen:
+            duplicates += 1
+            continue
+        seen.add(identity)
+        if key and archive is not None and key in archive:
+            archived += 1
+            continue
+        unique.append(url)
+    return unique, duplicates, archived